@@ -1,16 +1,84 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify
 from flask_cors import CORS
-import pymongo
+from werkzeug.middleware.proxy_fix import ProxyFix
+import os
+import time
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, PyMongoError
+from passwords import HashingOverloaded, PasswordHasher
+from login_limiter import LoginLimiter
+from common.metrics import instrument, timer
+from common.mongo import MongoPool, mongo_unavailable
+from common.tokens import InvalidToken, TokenIssuer, TokenVerifier
 
 app = Flask(__name__)
-app.secret_key = 'supersecretkey'
 CORS(app, supports_credentials=True, origins=["http://localhost:3000"])
 
-# MongoDB setup
-client = pymongo.MongoClient("mongodb://host.docker.internal:27017")
+# Request counts, latencies and sub-step timings at GET /metrics (see common/metrics.py)
+instrument(app, "auth")
+
+# MongoDB, pooled and with fail-fast timeouts (MONGO_* variables, see common/mongo.py)
+mongo = MongoPool.from_env()
+client = mongo.client
+app.register_error_handler(ConnectionFailure, mongo_unavailable)
 db = client["auth_db"]
 users = db["users"]
 
+# scrypt cost and pool size come from AUTH_SCRYPT_* / AUTH_HASH_* (see passwords.py)
+hasher = PasswordHasher.from_env()
+
+# Stateless sessions: signed tokens instead of a server-side cookie session,
+# so any replica can serve any user (see common/tokens.py for key rotation)
+tokens = TokenIssuer.from_env()
+refresh_verifier = TokenVerifier(tokens.public_keys(), issuer=tokens.issuer)
+
+# Brute-force protection for /login (LOGIN_* variables, see login_limiter.py)
+limiter = LoginLimiter.from_env(db["login_attempts"])
+# Behind a reverse proxy (the gateway) the client IP comes from X-Forwarded-For.
+# Only the last entry, added by that proxy, is trusted; anything before it
+# is whatever the client sent.
+TRUST_PROXY = os.getenv("LOGIN_TRUST_PROXY", "false").lower() == "true"
+if TRUST_PROXY:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+indexes_ready = False
+# After a failed create_index, wait this long before trying again rather
+# than rebuilding (and scanning users) on every signup and login
+INDEX_RETRY_INTERVAL = float(os.getenv("AUTH_INDEX_RETRY_INTERVAL", 300))
+index_retry_at = 0.0
+
+def ensure_indexes():
+    """Unique indexes make email/phone lookups index hits and signup race-free."""
+    global indexes_ready, index_retry_at
+    if indexes_ready or time.monotonic() < index_retry_at:
+        return
+    try:
+        # Partial so users without a phone (or email) don't collide on null
+        for field in ("email", "phone"):
+            users.create_index(
+                field,
+                unique=True,
+                name=f"{field}_unique",
+                partialFilterExpression={field: {"$type": "string"}},
+            )
+        indexes_ready = True
+    except ConnectionFailure:
+        # Mongo is down; let the request fail now (503) rather than retry the lookup
+        raise
+    except PyMongoError as e:
+        # e.g. existing duplicates; logins still work, just without the index
+        index_retry_at = time.monotonic() + INDEX_RETRY_INTERVAL
+        print(f"Could not create user indexes, retrying in {INDEX_RETRY_INTERVAL:.0f}s: {e}")
+
+def identifier_field(identifier):
+    """Login identifiers are either an email address or a phone number."""
+    return "email" if "@" in identifier else "phone"
+
+# Called by gunicorn in each worker after fork (see common/gunicorn_conf.py)
+def warm_up():
+    client.admin.command("ping")
+    ensure_indexes()
+    hasher.warm_up()
+
 @app.route("/signup", methods=["POST"])
 def signup():
     data = request.json
@@ -18,10 +86,24 @@ def signup():
     phone = data.get("phone")
     password = data.get("password")
 
-    if users.find_one({"$or": [{"email": email}, {"phone": phone}]}):
-        return jsonify({"error": "User already exists"}), 409
+    if not isinstance(password, str) or not password:
+        return jsonify({"error": "Password is required"}), 400
 
-    users.insert_one({"email": email, "phone": phone, "password": password})
+    try:
+        with timer("password_hash"):
+            password_hash = hasher.hash(password)
+    except HashingOverloaded as e:
+        return jsonify({"error": str(e)}), 503
+
+    ensure_indexes()
+    if not indexes_ready and users.find_one({"$or": [{"email": email}, {"phone": phone}]}):
+        # No unique indexes to rely on; check first as before
+        return jsonify({"error": "User already exists"}), 409
+    # The unique indexes reject an existing email or phone atomically
+    try:
+        users.insert_one({"email": email, "phone": phone, "password": password_hash})
+    except DuplicateKeyError:
+        return jsonify({"error": "User already exists"}), 409
     return jsonify({"message": "Signup successful"}), 201
 
 @app.route("/login", methods=["POST"])
@@ -30,20 +112,75 @@ def login():
     identifier = data.get("identifier")  # email or phone
     password = data.get("password")
 
-    user = users.find_one({
-        "$or": [{"email": identifier}, {"phone": identifier}],
-        "password": password
-    })
+    if not isinstance(identifier, str) or not identifier:
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    # Throttled before touching the users collection
+    reason, retry_after = limiter.check(request.remote_addr, identifier)
+    if reason:
+        response = jsonify({"error": "Too many login attempts, try again later"})
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 429
+
+    ensure_indexes()
+    # One equality match on an indexed field instead of an $or over both
+    user = users.find_one({identifier_field(identifier): identifier})
+
+    try:
+        with timer("password_verify"):
+            # A missing user is checked against a dummy hash, so timing doesn't reveal which accounts exist
+            valid, needs_rehash = hasher.verify(password, user.get("password") if user else None)
+    except HashingOverloaded as e:
+        return jsonify({"error": str(e)}), 503
+
+    if valid and needs_rehash:
+        # Plaintext or old-cost hash: replace it now that we know the password
+        try:
+            users.update_one(
+                {"_id": user["_id"], "password": user["password"]},
+                {"$set": {"password": hasher.hash(password)}}
+            )
+        except (HashingOverloaded, PyMongoError) as e:
+            print(f"Could not rehash password for {user['_id']}: {e}")
 
-    if user:
-        session['user'] = user['email']
+    if valid:
+        limiter.succeeded(identifier)
         return jsonify({
             "message": "Login successful",
             "email": user["email"],
-            "phone": user["phone"]
+            "phone": user["phone"],
+            **tokens.issue_pair(str(user["_id"]), {"email": user["email"], "phone": user["phone"]})
         }), 200
     else:
+        limiter.failed(identifier)
         return jsonify({"error": "Invalid credentials"}), 401
 
+@app.route("/refresh", methods=["POST"])
+def refresh():
+    data = request.json or {}
+    try:
+        claims = refresh_verifier.verify(data.get("refresh_token") or "", token_type="refresh")
+    except InvalidToken as e:
+        return jsonify({"error": f"Invalid refresh token: {e}"}), 401
+
+    return jsonify(tokens.issue_pair(claims["sub"], {"email": claims.get("email"), "phone": claims.get("phone")})), 200
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Readiness: Mongo reachable within the timeouts, plus pool utilization
+    body, status = mongo.health()
+    return jsonify(body), status
+
+@app.route("/login-stats", methods=["GET"])
+def login_stats():
+    return jsonify(limiter.stats())
+
+@app.route("/.well-known/jwks.json", methods=["GET"])
+def jwks():
+    # Public keys for TokenVerifier in the other services; cacheable
+    response = jsonify(tokens.jwks())
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
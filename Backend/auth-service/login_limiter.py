@@ -0,0 +1,182 @@
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING
+
+
+class WindowCounter:
+    """Approximate sliding-window counter kept in process.
+
+    Each key holds only its current and previous fixed-window counts; the
+    sliding count is the current count plus the previous one weighted by how
+    much of it still overlaps the window. Keys live in an LRU capped at
+    `max_keys`, so memory stays bounded however many distinct keys arrive.
+    """
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> [window_index, current, previous]
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def retry_after(self, key):
+        """Seconds until `key` may try again, or 0 if it is under the limit."""
+        now = time.time()
+        index, elapsed = divmod(now, self.window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0
+            current, previous = self._roll(entry, int(index))
+        estimate = current + previous * (1 - elapsed / self.window)
+        if estimate < self.limit:
+            return 0
+        return max(1, math.ceil(self.window - elapsed))
+
+    def hit(self, key):
+        index = int(time.time() // self.window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [index, 0, 0]
+                if len(self._entries) > self.max_keys:
+                    self._entries.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._entries.move_to_end(key)
+            self._roll(entry, index)
+            entry[1] += 1
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _roll(entry, index):
+        # Move the counts forward to the window `index` falls in
+        if entry[0] != index:
+            entry[2] = entry[1] if entry[0] == index - 1 else 0
+            entry[1] = 0
+            entry[0] = index
+        return entry[1], entry[2]
+
+
+class MongoWindowCounter:
+    """The same sliding-window estimate, with counts shared through Mongo.
+
+    For deployments with several workers or replicas. Each fixed window is a
+    document incremented with $inc and removed by a TTL index once it can no
+    longer affect the estimate. Costs one read per check and one write per hit.
+    """
+
+    def __init__(self, collection, prefix, limit, window):
+        self.collection = collection
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self._indexed = False
+        self.evicted = 0
+
+    def retry_after(self, key):
+        now = time.time()
+        index, elapsed = divmod(now, self.window)
+        index = int(index)
+        ids = [self._id(key, index), self._id(key, index - 1)]
+        counts = {doc["_id"]: doc["count"] for doc in self.collection.find({"_id": {"$in": ids}})}
+        estimate = counts.get(ids[0], 0) + counts.get(ids[1], 0) * (1 - elapsed / self.window)
+        if estimate < self.limit:
+            return 0
+        return max(1, math.ceil(self.window - elapsed))
+
+    def hit(self, key):
+        self._ensure_index()
+        index = int(time.time() // self.window)
+        expires_at = datetime.fromtimestamp((index + 2) * self.window, timezone.utc)
+        self.collection.update_one(
+            {"_id": self._id(key, index)},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+            upsert=True,
+        )
+
+    def reset(self, key):
+        index = int(time.time() // self.window)
+        self.collection.delete_many({"_id": {"$in": [self._id(key, index), self._id(key, index - 1)]}})
+
+    def size(self):
+        return None
+
+    def _id(self, key, index):
+        return f"{self.prefix}:{key}:{index}"
+
+    def _ensure_index(self):
+        if not self._indexed:
+            self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+            self._indexed = True
+
+
+class LoginLimiter:
+    """Throttles logins per client IP (every attempt) and per identifier (failed attempts).
+
+    check() runs before the user lookup so throttled requests never reach
+    the users collection.
+    """
+
+    def __init__(self, ip_counter, identifier_counter):
+        self.ip_counter = ip_counter
+        self.identifier_counter = identifier_counter
+        self.rejected = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, collection=None):
+        ip_limit = int(os.getenv("LOGIN_IP_LIMIT", 60))
+        ip_window = float(os.getenv("LOGIN_IP_WINDOW", 60))
+        identifier_limit = int(os.getenv("LOGIN_IDENTIFIER_LIMIT", 10))
+        identifier_window = float(os.getenv("LOGIN_IDENTIFIER_WINDOW", 900))
+
+        if os.getenv("LOGIN_LIMITER_BACKEND", "memory").lower() == "mongo" and collection is not None:
+            return cls(
+                MongoWindowCounter(collection, "ip", ip_limit, ip_window),
+                MongoWindowCounter(collection, "id", identifier_limit, identifier_window),
+            )
+
+        max_keys = int(os.getenv("LOGIN_LIMITER_MAX_KEYS", 100000))
+        return cls(
+            WindowCounter(ip_limit, ip_window, max_keys),
+            WindowCounter(identifier_limit, identifier_window, max_keys),
+        )
+
+    def check(self, ip, identifier):
+        """Counts the attempt against the IP; returns (reason, retry_after) if it should be rejected."""
+        for reason, counter, key in (("ip", self.ip_counter, ip), ("identifier", self.identifier_counter, identifier)):
+            wait = counter.retry_after(key)
+            if wait:
+                with self._lock:
+                    self.rejected[reason] += 1
+                return reason, wait
+        self.ip_counter.hit(ip)
+        return None, 0
+
+    def failed(self, identifier):
+        self.identifier_counter.hit(identifier)
+
+    def succeeded(self, identifier):
+        self.identifier_counter.reset(identifier)
+
+    def stats(self):
+        with self._lock:
+            rejected = dict(self.rejected)
+        return {
+            "rejected": rejected,
+            "tracked_keys": {"ip": self.ip_counter.size(), "identifier": self.identifier_counter.size()},
+            "evicted_keys": self.ip_counter.evicted + self.identifier_counter.evicted,
+        }
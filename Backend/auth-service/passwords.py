@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+PREFIX = "scrypt"
+DUMMY_SALT = b"no-such-user"
+# Stored hashes asking for more scrypt memory than this are treated as corrupt
+MAX_STORED_MEMORY = 256 * 1024 * 1024
+
+
+class HashingOverloaded(Exception):
+    """Too many hashes are already queued; the caller should answer 503."""
+
+
+def _scrypt(password, salt, n, r, p):
+    # Module level so the pool's worker processes can import it
+    maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=32)
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode()
+
+
+class PasswordHasher:
+    """Salted scrypt hashes computed in a bounded pool of worker processes.
+
+    Stored hashes look like scrypt$<n>$<r>$<p>$<salt>$<hash>, so the cost can
+    be raised per deployment (AUTH_SCRYPT_*) and old hashes still verify;
+    verify() reports when a hash, or a legacy plaintext password, should be
+    replaced. At most `max_pending` hashes are queued at once; beyond that
+    callers get HashingOverloaded instead of piling up behind the pool.
+    """
+
+    def __init__(self, n=2 ** 14, r=8, p=1, workers=None, max_pending=64, wait=5.0):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.workers = workers or os.cpu_count() or 1
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        workers = os.getenv("AUTH_HASH_WORKERS")
+        return cls(
+            n=int(os.getenv("AUTH_SCRYPT_N", 2 ** 14)),
+            r=int(os.getenv("AUTH_SCRYPT_R", 8)),
+            p=int(os.getenv("AUTH_SCRYPT_P", 1)),
+            workers=int(workers) if workers else None,
+            max_pending=int(os.getenv("AUTH_HASH_MAX_PENDING", 64)),
+            wait=float(os.getenv("AUTH_HASH_WAIT", 5)),
+        )
+
+    def hash(self, password):
+        salt = secrets.token_bytes(16)
+        derived = self._run(password, salt, self.n, self.r, self.p)
+        return f"{PREFIX}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(derived)}"
+
+    def verify(self, password, stored):
+        """Returns (matches, needs_rehash). stored is None for an unknown user."""
+        if not isinstance(password, str):
+            return False, False
+        if stored is None:
+            # Same work as a real check, so a missing account isn't faster to reject
+            self._run(password, DUMMY_SALT, self.n, self.r, self.p)
+            return False, False
+        if not isinstance(stored, str):
+            return False, False
+
+        if not stored.startswith(PREFIX + "$"):
+            # Plaintext row from before hashing; upgraded on successful login
+            return hmac.compare_digest(password.encode(), stored.encode()), True
+
+        try:
+            _, n, r, p, salt, expected = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            salt, expected = base64.b64decode(salt), base64.b64decode(expected)
+        except ValueError:
+            return False, False
+        if min(n, r, p) < 1 or 128 * r * (n + p + 2) > MAX_STORED_MEMORY:
+            return False, False
+
+        try:
+            derived = self._run(password, salt, n, r, p)
+        except (ValueError, MemoryError, OverflowError):
+            # Cost values hashlib.scrypt rejects, e.g. n not a power of two
+            return False, False
+        return hmac.compare_digest(derived, expected), (n, r, p) != (self.n, self.r, self.p)
+
+    def warm_up(self):
+        # Start the worker processes now rather than on the first login
+        self._run("", b"warm-up", 2, 1, 1)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+            self._pid = None
+
+    def _run(self, password, salt, n, r, p):
+        if not self._slots.acquire(timeout=self.wait):
+            raise HashingOverloaded("Password hashing is overloaded, try again shortly")
+        try:
+            executor = self._pool()
+            return executor.submit(_scrypt, password, salt, n, r, p).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next call gets a new pool
+            with self._lock:
+                if self._executor is executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._pid = None
+            raise
+        finally:
+            self._slots.release()
+
+    def _pool(self):
+        # One pool per process, created on first use (gunicorn workers fork)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # spawn, not fork: request threads may be mid-flight
+                    context = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+                    self._pid = os.getpid()
+        return self._executor
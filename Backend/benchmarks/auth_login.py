@@ -0,0 +1,97 @@
+"""Login lookup benchmark for auth-service.
+
+Seeds a users collection in a real MongoDB (indexes need a real server),
+then times the login query in its two shapes:
+
+    before - {"$or": [{"email": id}, {"phone": id}], "password": pw} with no indexes
+    after  - {"email": id} or {"phone": id} against the unique
+             indexes auth-service creates at startup
+
+Half the logins use an email and half a phone number. The seeded data is
+kept between runs; pass --reseed to start over.
+
+    python benchmarks/auth_login.py --mongo mongodb://localhost:27017 --users 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import pymongo
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def make_user(i):
+    return {"email": f"user{i}@example.com", "phone": f"+9190{i:08d}", "password": f"pw{i}"}
+
+
+def seed(users, count, chunk=10000):
+    users.drop()
+    t0 = time.perf_counter()
+    for start in range(0, count, chunk):
+        users.insert_many([make_user(i) for i in range(start, min(count, start + chunk))], ordered=False)
+    print(f"seeded {count} users in {time.perf_counter() - t0:.1f}s")
+
+
+def login_before(users, identifier, password):
+    return users.find_one({"$or": [{"email": identifier}, {"phone": identifier}], "password": password})
+
+
+def login_after(users, identifier, password):
+    # The password is checked against the hash afterwards, outside the query
+    field = "email" if "@" in identifier else "phone"
+    return users.find_one({field: identifier})
+
+
+def run(label, users, login, logins, count, rng):
+    latencies = []
+    for _ in range(logins):
+        user = make_user(rng.randrange(count))
+        identifier = user["email"] if rng.random() < 0.5 else user["phone"]
+        t0 = time.perf_counter()
+        found = login(users, identifier, user["password"])
+        latencies.append(time.perf_counter() - t0)
+        assert found is not None, identifier
+
+    latencies.sort()
+    print(f"{label:<8}{logins:>8}{statistics.mean(latencies) * 1000:>10.2f}"
+          f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}"
+          f"{len(latencies) / sum(latencies):>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="auth_benchmark")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--logins", type=int, default=200, help="timed logins per query shape")
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    users = pymongo.MongoClient(args.mongo)[args.db]["users"]
+    if args.reseed or users.estimated_document_count() != args.users:
+        seed(users, args.users)
+
+    # Without indexes every login is a collection scan, so time fewer of them
+    for name in list(users.index_information()):
+        if name != "_id_":
+            users.drop_index(name)
+    print(f"{'query':<8}{'logins':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'logins/s':>12}")
+    run("before", users, login_before, max(1, args.logins // 10), args.users, random.Random(args.seed))
+
+    t0 = time.perf_counter()
+    for field in ("email", "phone"):
+        users.create_index(field, unique=True, name=f"{field}_unique",
+                           partialFilterExpression={field: {"$type": "string"}})
+    index_s = time.perf_counter() - t0
+    run("after", users, login_after, args.logins, args.users, random.Random(args.seed))
+    print(f"building both unique indexes took {index_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
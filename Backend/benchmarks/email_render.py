@@ -0,0 +1,110 @@
+"""Render benchmark for email-service templates and MIME building.
+
+Compares the previous per-send code (f-string loop plus MIMEText and
+base64 for each message) with the compiled templates and the reused MIME
+skeleton in email-service, for:
+
+    offers  - one offer email with --offers offers (1,000+ by default)
+    bulk    - one text sent to --recipients recipients, as /send-emails-bulk does
+
+    python benchmarks/email_render.py --offers 100 1000 5000 --recipients 100 1000
+"""
+import argparse
+import base64
+import os
+import random
+import statistics
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "email-service"))
+
+from email_templates import offer_rows, render  # noqa: E402
+from mime_message import MimeBuilder, _encoded_body, _encoded_subject  # noqa: E402
+
+DESTINATIONS = ["Paris", "Tokyo", "Goa", "Kyoto", "Maldives", "Rome", "Sydney"]
+
+
+def legacy_message(to, subject, text):
+    message = MIMEText(text)
+    message["to"] = to
+    message["from"] = "me"
+    message["subject"] = subject
+    return {"raw": base64.urlsafe_b64encode(message.as_bytes()).decode()}
+
+
+def legacy_offer_body(offers):
+    body_lines = ["Here are some exciting personalized travel deals just for you:\n"]
+    for idx, offer in enumerate(offers, 1):
+        body_lines.append(
+            f"{idx}. ✈️ {offer.get('destination', 'Unknown')} — {offer.get('offer_type', 'Unknown Package')}\n"
+            f"   • {offer.get('description', '')}\n"
+            f"   • Price: ${offer.get('price_usd', 0)}\n"
+            f"   • Discount: {offer.get('discount_percent', 0)}% OFF\n"
+        )
+    return "\n".join(body_lines)
+
+
+def make_offers(count, rng):
+    return [
+        {
+            "destination": rng.choice(DESTINATIONS),
+            "offer_type": rng.choice(["Flight + Hotel", "Cruise", "Weekend Getaway"]),
+            "price_usd": rng.randint(200, 5000),
+            "discount_percent": rng.choice([5, 10, 15, 20]),
+            "description": "Limited-time deal including breakfast and airport transfers",
+        }
+        for _ in range(count)
+    ]
+
+
+def timed(func, rounds):
+    timings = []
+    for _ in range(rounds):
+        _encoded_body.cache_clear()
+        _encoded_subject.cache_clear()
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+def report(label, legacy_ms, new_ms):
+    print(f"{label:<28}{legacy_ms:>12.3f}{new_ms:>12.3f}{legacy_ms / new_ms:>10.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--recipients", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    builder = MimeBuilder("me")
+    print(f"{'case':<28}{'before ms':>12}{'after ms':>12}{'speedup':>11}")
+
+    for count in args.offers:
+        offers = make_offers(count, rng)
+        subject = "🎉 Exclusive Travel Offers Just for You!"
+        assert render("offer", offer_rows(offers))[1] == legacy_offer_body(offers)
+
+        report(
+            f"offer email, {count} offers",
+            timed(lambda: legacy_message("user@example.com", subject, legacy_offer_body(offers)), args.rounds),
+            timed(lambda: builder.build("user@example.com", *render("offer", offer_rows(offers))), args.rounds),
+        )
+
+    subject, body = render("offer", offer_rows(make_offers(20, rng)))
+    for count in args.recipients:
+        recipients = [f"user{i}@example.com" for i in range(count)]
+        report(
+            f"bulk, {count} recipients",
+            timed(lambda: [legacy_message(to, subject, body) for to in recipients], args.rounds),
+            timed(lambda: [builder.build(to, subject, body) for to in recipients], args.rounds),
+        )
+
+
+if __name__ == "__main__":
+    main()
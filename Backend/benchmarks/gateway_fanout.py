@@ -0,0 +1,123 @@
+"""Gateway benchmark: /book-notify fan-out and plain proxy overhead.
+
+Runs fake email, sms and push services that answer after --latency-ms,
+and the gateway in front of them, all in this process. It then measures:
+
+    sequential  - the three notification calls one after another, as the
+                  booking page made them, straight to the services
+    book-notify - one call to the gateway, which sends the three concurrently
+    proxy       - one call through the gateway vs straight to a service,
+                  showing what the extra hop costs with pooled connections
+
+    python benchmarks/gateway_fanout.py --latency-ms 50 --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+from aiohttp import ClientSession, TCPConnector, web
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gateway")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_app(app, port):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def fake_service(latency):
+    async def handle(request):
+        await request.read()
+        await asyncio.sleep(latency)
+        return web.json_response({"message": "sent", "id": "x"})
+
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", handle)
+    return app
+
+
+async def timed(func, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            await func()
+            timings.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - t0
+    timings.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000,
+    }
+
+
+def report(label, result):
+    print(f"{label:<26}{result['rps']:>10.0f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+
+async def main(args):
+    ports = {name: free_port() for name in ("email", "sms", "push", "gateway")}
+    for name in ("email", "sms", "push"):
+        os.environ[f"GATEWAY_{name.upper()}_URL"] = f"http://127.0.0.1:{ports[name]}"
+
+    sys.path.insert(0, SERVICE_DIR)
+    import app as gateway  # noqa: E402
+
+    runners = [await start_app(fake_service(args.latency_ms / 1000), ports[name]) for name in ("email", "sms", "push")]
+    runners.append(await start_app(gateway.create_app(), ports["gateway"]))
+
+    booking = {"email": "a@example.com", "phone": "+15550000000", "destination": "Goa", "ticketType": "economy"}
+    direct = {name: f"http://127.0.0.1:{ports[name]}" for name in ("email", "sms", "push")}
+    gateway_url = f"http://127.0.0.1:{ports['gateway']}"
+
+    async with ClientSession(connector=TCPConnector(limit=args.concurrency)) as session:
+        async def post(url, payload):
+            async with session.post(url, json=payload) as response:
+                await response.read()
+                return response.status
+
+        async def sequential():
+            await post(f"{direct['email']}/send-email", booking)
+            await post(f"{direct['sms']}/send-sms", booking)
+            await post(f"{direct['push']}/send-push", {"message": "Book your return ticket to Goa now!"})
+
+        async def book_notify():
+            status = await post(f"{gateway_url}/book-notify", booking)
+            assert status == 200, status
+
+        print(f"{'case':<26}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        report("sequential, direct", await timed(sequential, args.requests, args.concurrency))
+        report("/book-notify", await timed(book_notify, args.requests, args.concurrency))
+        report("one call, direct", await timed(
+            lambda: post(f"{direct['email']}/send-email", booking), args.requests, args.concurrency))
+        report("one call, via gateway", await timed(
+            lambda: post(f"{gateway_url}/email/send-email", booking), args.requests, args.concurrency))
+
+    for runner in reversed(runners):
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
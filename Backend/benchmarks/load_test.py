@@ -0,0 +1,169 @@
+"""HTTP load test for the five Backend services.
+
+Each service is hit on an endpoint that exercises the web server and app
+without calling an external provider (validation errors for email/sms, the
+CORS preflight for push). Every worker thread keeps one keep-alive
+connection open, like a pooled client would.
+
+/login is throttled per IP and per identifier (auth-service/login_limiter.py),
+so every auth request uses a new identifier and X-Forwarded-For address.
+The address only counts when auth-service runs with LOGIN_TRUST_PROXY=true;
+otherwise raise LOGIN_IP_LIMIT for the run. 429s are reported in their own
+column, so a run that mostly measured the limiter is easy to spot.
+
+Compare serving modes by running it once per mode:
+
+    APP_MODE=dev docker compose up -d --build
+    python benchmarks/load_test.py --json > dev.json
+    APP_MODE=prod docker compose up -d --build
+    python benchmarks/load_test.py --json > prod.json
+    python benchmarks/load_test.py --compare dev.json prod.json
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+
+# service -> (port, method, path, body); expected statuses are listed for reference
+TARGETS = {
+    "auth": (5000, "POST", "/login", {"identifier": "loadtest@example.com", "password": "x"}),  # 401, see VARY
+    "email": (5002, "POST", "/send-email", {}),  # 400
+    "sms": (5003, "POST", "/send-quote-sms", {}),  # 400
+    "push": (5004, "OPTIONS", "/send-push", None),  # 200
+    "price": (5005, "POST", "/get-price", {
+        "destination": "goa", "ticketType": "business", "flightDate": "2025-06-01", "flightTime": "evening"
+    }),  # 200
+}
+
+
+# Services whose requests get a fresh identifier and client address each time
+VARY = {"auth"}
+
+
+def vary(body, headers, n):
+    body = dict(body, identifier=f"loadtest-{n}@example.com")
+    headers = dict(headers, **{"X-Forwarded-For": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"})
+    return json.dumps(body), headers
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def worker(host, port, method, path, body, varied, first, deadline, latencies, statuses, lock):
+    payload = json.dumps(body) if body is not None else None
+    headers = {"Content-Type": "application/json", "Origin": "http://localhost:3000"}
+    request_headers = headers
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local_latencies = []
+    local_statuses = Counter()
+    n = first
+
+    while time.perf_counter() < deadline:
+        if varied:
+            payload, request_headers = vary(body, headers, n)
+            n += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=request_headers)
+            response = conn.getresponse()
+            response.read()
+            local_statuses[response.status] += 1
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException) as e:
+            local_statuses[type(e).__name__] += 1
+            conn.close()
+            continue
+        local_latencies.append(time.perf_counter() - t0)
+
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def run_service(name, host, concurrency, duration):
+    port, method, path, body = TARGETS[name]
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    threads = [
+        threading.Thread(target=worker, args=(host, port, method, path, body, name in VARY, i << 20, deadline,
+                                              latencies, statuses, lock))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = 1000
+    errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 500)
+    return {
+        "service": name,
+        "endpoint": f"{method} {path}",
+        "requests": len(latencies),
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * ms, 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 50) * ms, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * ms, 2) if latencies else None,
+        "errors": errors,
+        "throttled": statuses.get(429, 0),
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def print_results(results):
+    print(f"{'service':<8}{'endpoint':<24}{'req/s':>10}{'mean':>9}{'p50':>9}{'p99':>9}{'errors':>8}{'429s':>8}  (ms)")
+    for r in results:
+        print(f"{r['service']:<8}{r['endpoint']:<24}{r['req_per_sec']:>10}{r['mean_ms']!s:>9}"
+              f"{r['p50_ms']!s:>9}{r['p99_ms']!s:>9}{r['errors']:>8}{r.get('throttled', 0):>8}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {r["service"]: r for r in json.load(f)}
+    with open(after_path) as f:
+        after = {r["service"]: r for r in json.load(f)}
+
+    print(f"{'service':<8}{'before req/s':>14}{'after req/s':>14}{'speedup':>9}{'p99 before':>12}{'p99 after':>11}")
+    for name in before:
+        if name not in after:
+            continue
+        b, a = before[name], after[name]
+        speedup = a["req_per_sec"] / b["req_per_sec"] if b["req_per_sec"] else float("inf")
+        print(f"{name:<8}{b['req_per_sec']:>14}{a['req_per_sec']:>14}{speedup:>8.2f}x"
+              f"{b['p99_ms']!s:>12}{a['p99_ms']!s:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--services", nargs="*", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--concurrency", type=int, default=32, help="client threads per service")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per service")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two --json result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = [run_service(name, args.host, args.concurrency, args.duration) for name in args.services]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
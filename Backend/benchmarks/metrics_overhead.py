@@ -0,0 +1,108 @@
+"""Collection overhead of common/metrics.py.
+
+Times the recording calls on their own (observe, inc, timer), the
+request middleware around a bare WSGI app, and then a trivial Flask
+route served with and without instrument(). Plain and instrumented
+rounds alternate and the fastest round of each is reported, since the
+difference is small next to a Flask request. With --threads > 1 the
+requests run on several threads at once, which is where a shared lock
+would show up.
+
+    python benchmarks/metrics_overhead.py --requests 5000 --threads 1 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import Flask  # noqa: E402
+
+from common import metrics  # noqa: E402
+
+
+def per_call_us(func, calls):
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def make_app(instrumented):
+    app = Flask(__name__)
+    if instrumented:
+        metrics.instrument(app, "bench")
+
+    @app.route("/ping/<item>")
+    def ping(item):
+        return "ok"
+
+    return app
+
+
+def serve(app, requests, threads):
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": "/ping/1", "SERVER_NAME": "bench", "SERVER_PORT": "80",
+        "wsgi.url_scheme": "http", "wsgi.input": None, "wsgi.errors": sys.stderr,
+    }
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def run(count):
+        for _ in range(count):
+            b"".join(app(dict(environ), start_response))
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(run, [requests // threads] * threads))
+    return (time.perf_counter() - t0) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    labels = (("step", "bench"), ("outcome", "ok"))
+
+    def with_timer():
+        with metrics.timer("bench"):
+            pass
+
+    print("recording call                     us/call")
+    print(f"{'observe()':<32}{per_call_us(lambda: metrics.REGISTRY.observe('bench', labels, 0.003), args.calls):>10.3f}")
+    print(f"{'inc()':<32}{per_call_us(lambda: metrics.REGISTRY.inc('bench_total', labels), args.calls):>10.3f}")
+    print(f"{'with timer()':<32}{per_call_us(with_timer, args.calls):>10.3f}")
+
+    def bare_app(environ, start_response):
+        start_response("200 OK", [])
+        return [b"ok"]
+
+    middleware = metrics._RequestMetrics(bare_app, metrics.REGISTRY)
+    environ = {"REQUEST_METHOD": "GET"}
+    bare = per_call_us(lambda: bare_app(environ, lambda *a: None), args.calls)
+    wrapped = per_call_us(lambda: middleware(environ, lambda *a: None), args.calls)
+    print(f"{'request middleware':<32}{wrapped - bare:>10.3f}")
+
+    plain, instrumented = make_app(False), make_app(True)
+    print(f"\n{'threads':<10}{'plain us/req':>14}{'instrumented':>14}{'overhead us':>14}")
+    for threads in args.threads:
+        base, timed = [], []
+        for _ in range(args.rounds):
+            base.append(serve(plain, args.requests, threads))
+            timed.append(serve(instrumented, args.requests, threads))
+        print(f"{threads:<10}{min(base):>14.2f}{min(timed):>14.2f}{min(timed) - min(base):>14.2f}")
+
+    t0 = time.perf_counter()
+    metrics.REGISTRY.render()
+    print(f"\n/metrics render: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
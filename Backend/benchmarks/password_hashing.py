@@ -0,0 +1,69 @@
+"""Password hashing cost benchmark for auth-service.
+
+For each scrypt cost (AUTH_SCRYPT_N) it times verify() on one core, which is
+what a login costs, and then the throughput of the hashing pool with
+--workers processes. Use it to pick the largest N your login rate allows.
+
+    python benchmarks/password_hashing.py --costs 12 13 14 15 --workers 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "auth-service"))
+
+from passwords import PasswordHasher, _scrypt  # noqa: E402
+
+
+def single_core(n, r, p, rounds):
+    salt = os.urandom(16)
+    timings = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        _scrypt("correct horse battery staple", salt, n, r, p)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def pooled(n, r, p, workers, logins):
+    hasher = PasswordHasher(n=n, r=r, p=p, workers=workers, max_pending=workers * 4)
+    try:
+        stored = hasher.hash("correct horse battery staple")
+        hasher.warm_up()
+
+        # Request threads share the pool, like gthread workers would
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(workers * 2) as threads:
+            results = list(threads.map(lambda _: hasher.verify("correct horse battery staple", stored),
+                                       range(logins)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        # Don't leave each cost's worker processes running
+        hasher.shutdown()
+    assert all(ok for ok, _ in results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15, 16], help="log2 of scrypt N")
+    parser.add_argument("-r", type=int, default=8)
+    parser.add_argument("-p", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=20, help="single-core timings per cost")
+    parser.add_argument("--logins", type=int, default=200, help="logins through the pool per cost")
+    args = parser.parse_args()
+
+    print(f"{'N':>8}{'ms/login':>10}{'logins/s/core':>15}{f'pool x{args.workers} logins/s':>24}")
+    for cost in args.costs:
+        n = 2 ** cost
+        seconds = single_core(n, args.r, args.p, args.rounds)
+        throughput = pooled(n, args.r, args.p, args.workers, args.logins)
+        print(f"{'2^' + str(cost):>8}{seconds * 1000:>10.1f}{1 / seconds:>15.1f}{throughput:>24.1f}")
+
+
+if __name__ == "__main__":
+    main()
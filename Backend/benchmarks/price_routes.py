@@ -0,0 +1,149 @@
+"""Route-level benchmark for price-service.
+
+Drives every pricing route through the Flask test client with Mongo replaced
+by an in-memory mongomock client, and reports requests/sec and latency
+percentiles per route.
+
+    pip install -r price-service/requirements.txt -r benchmarks/requirements.txt
+    python benchmarks/price_routes.py --requests 2000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import mongomock
+import pymongo
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVICE_DIR = os.path.join(BACKEND_DIR, "price-service")
+
+DESTINATIONS = ["delhi", "mumbai", "goa", "pune", "shimla", "paris", "tokyo"]
+TAGS = ["adventure", "relaxation", "hill station", "beach", "heritage"]
+
+
+def flight_payload(rng):
+    return {
+        "destination": rng.choice(DESTINATIONS),
+        "ticketType": rng.choice(["economy", "business"]),
+        "flightDate": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "flightTime": rng.choice(["morning", "afternoon", "evening"]),
+    }
+
+
+def package_payload(rng):
+    return {
+        "_id": str(rng.randint(1, 10**6)),
+        "price": rng.randint(5000, 50000),
+        "destination": rng.choice(DESTINATIONS),
+        "duration": f"{rng.randint(1, 10)} days",
+        "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        "bookings": rng.randint(0, 50),
+        "visitors": rng.randint(0, 1000),
+        "dynamicPricing": True,
+    }
+
+
+def package_updated_payload(rng):
+    return {
+        "_id": str(rng.randint(1, 10**6)),
+        "price": rng.randint(5000, 50000),
+        "destination": rng.choice(DESTINATIONS),
+        "date": f"2025-{rng.randint(1, 12):02d}-15",
+        "spring_multiplier": 5,
+        "summer_multiplier": 15,
+        "autumn_multiplier": 0,
+        "winter_multiplier": 10,
+    }
+
+
+def batch_payload(rng, size=100):
+    return {"items": [flight_payload(rng) for _ in range(size)]}
+
+
+ROUTES = {
+    "/get-price": flight_payload,
+    "/get-price-batch": batch_payload,
+    "/package-price": package_payload,
+    "/package-price-updated": package_updated_payload,
+}
+
+
+def load_app():
+    # app.py connects at import time, so swap in the in-memory client first
+    pymongo.MongoClient = mongomock.MongoClient
+    # Backend/ for the shared common package
+    sys.path[:0] = [SERVICE_DIR, BACKEND_DIR]
+    import app
+    return app
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_route(client, route, make_payload, requests, warmup, seed):
+    rng = random.Random(seed)
+    payloads = [make_payload(rng) for _ in range(requests + warmup)]
+
+    for payload in payloads[:warmup]:
+        client.post(route, json=payload)
+
+    latencies = []
+    started = time.perf_counter()
+    for payload in payloads[warmup:]:
+        t0 = time.perf_counter()
+        response = client.post(route, json=payload)
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            raise RuntimeError(f"{route} returned {response.status_code}: {response.get_data(as_text=True)}")
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = 1000
+    return {
+        "route": route,
+        "requests": requests,
+        "req_per_sec": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * ms, 3),
+        "p50_ms": round(percentile(latencies, 50) * ms, 3),
+        "p90_ms": round(percentile(latencies, 90) * ms, 3),
+        "p99_ms": round(percentile(latencies, 99) * ms, 3),
+        "max_ms": round(latencies[-1] * ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests per route")
+    parser.add_argument("--routes", nargs="*", default=list(ROUTES), choices=list(ROUTES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    app = load_app()
+    client = app.app.test_client()
+
+    results = [
+        bench_route(client, route, ROUTES[route], args.requests, args.warmup, args.seed)
+        for route in args.routes
+    ]
+    app.price_log.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'route':<24}{'req/s':>10}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)")
+    for r in results:
+        print(f"{r['route']:<24}{r['req_per_sec']:>10}{r['mean_ms']:>9}{r['p50_ms']:>9}"
+              f"{r['p90_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
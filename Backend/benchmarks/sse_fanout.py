@@ -0,0 +1,159 @@
+"""Fan-out benchmark for push-service's built-in SSE hub.
+
+Starts the hub (push-service/sse_hub.py) in this process, connects
+--subscribers EventSource-style clients from child processes, publishes
+--events timestamped events spread over --channels channels, and reports how
+many subscribers the hub held, the publish-to-receive latency and the hub
+process's memory.
+
+    pip install -r push-service/requirements.txt
+    python benchmarks/sse_fanout.py --subscribers 5000 --events 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "push-service")
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+async def subscribe(session, url, latencies, ready):
+    async with session.get(url) as response:
+        ready.append(1)
+        async for line in response.content:
+            if line.startswith(b"data: "):
+                sent_at = json.loads(line[6:])["sent_at"]
+                latencies.append(time.time() - sent_at)
+
+
+async def run_clients(args, indexes, stop, results):
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+    latencies, ready = [], []
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = []
+        for n, i in enumerate(indexes):
+            url = f"http://127.0.0.1:{args.port}/events?channels=bench-{i % args.channels}"
+            tasks.append(asyncio.create_task(subscribe(session, url, latencies, ready)))
+            if n % 200 == 199:
+                await asyncio.sleep(0)  # let the hub accept before opening more
+
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        for task in tasks:
+            task.cancel()
+        failed = sum(
+            1 for r in await asyncio.gather(*tasks, return_exceptions=True)
+            if isinstance(r, Exception) and not isinstance(r, asyncio.CancelledError)
+        )
+
+    results.put({"connected": len(ready), "failed": failed, "latencies": latencies})
+
+
+def client_process(args, indexes, stop, results):
+    raise_fd_limit()
+    asyncio.run(run_clients(args, indexes, stop, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--events", type=int, default=100, help="events published in total")
+    parser.add_argument("--rate", type=float, default=50, help="events published per second")
+    parser.add_argument("--port", type=int, default=5014)
+    parser.add_argument("--buffer", type=int, default=64, help="per-subscriber buffer (PUSH_SSE_BUFFER)")
+    parser.add_argument("--client-processes", type=int, default=4,
+                        help="processes the subscribers are spread over, so the clients aren't the bottleneck")
+    parser.add_argument("--connect-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    limit = raise_fd_limit()
+    if args.subscribers + 100 > limit:
+        print(f"Open file limit is {limit}; lower --subscribers or raise ulimit -n")
+
+    sys.path.insert(0, SERVICE_DIR)
+    from sse_hub import SseHub
+
+    rss_idle = rss_mb()
+    hub = SseHub(host="127.0.0.1", port=args.port, buffer_size=args.buffer)
+    hub.start()
+
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    clients = [
+        multiprocessing.Process(
+            target=client_process,
+            args=(args, range(p, args.subscribers, args.client_processes), stop, results),
+        )
+        for p in range(args.client_processes)
+    ]
+    for process in clients:
+        process.start()
+
+    t0 = time.perf_counter()
+    while hub.stats()["subscribers"] < args.subscribers and time.perf_counter() - t0 < args.connect_timeout:
+        time.sleep(0.1)
+    connect_s = time.perf_counter() - t0
+    rss_connected = rss_mb()
+    subscribers = hub.stats()["subscribers"]
+
+    for i in range(args.events):
+        hub.publish(f"bench-{i % args.channels}", "bench", {"seq": i, "sent_at": time.time()})
+        time.sleep(1 / args.rate)
+    time.sleep(2)  # let the last events drain
+
+    stop.set()
+    outcomes = [results.get() for _ in clients]
+    for process in clients:
+        process.join()
+    stats = hub.stats()
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome["latencies"])
+    client_errors = sum(outcome["failed"] for outcome in outcomes)
+    expected = sum(
+        len(range(c, args.subscribers, args.channels)) * len(range(c, args.events, args.channels))
+        for c in range(args.channels)
+    )
+
+    print(f"subscribers connected   {subscribers} of {args.subscribers} in {connect_s:.1f}s "
+          f"({client_errors} client errors)")
+    print(f"events published        {stats['published']} over {args.channels} channels")
+    print(f"deliveries received     {len(latencies)} of {expected} expected, {stats['evicted']} evicted")
+    if latencies:
+        print(f"publish->receive ms     p50 {percentile(latencies, 50) * 1000:.2f}  "
+              f"p90 {percentile(latencies, 90) * 1000:.2f}  "
+              f"p99 {percentile(latencies, 99) * 1000:.2f}  max {latencies[-1] * 1000:.2f}")
+    if rss_idle and rss_connected:
+        per_sub = (rss_connected - rss_idle) * 1024 / max(subscribers, 1)
+        print(f"hub RSS MB              {rss_idle} idle, {rss_connected} connected (~{per_sub:.1f} KB/subscriber)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""gunicorn settings for APP_MODE=prod, shared by all Backend services.
+
+Everything is tunable through env vars so each service can be sized in
+docker-compose.yml without touching code.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+# The app is imported in each worker after fork: MongoClient, Twilio and
+# Pusher clients hold sockets and threads that must not be shared across
+# processes.
+preload_app = False
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    # Open upstream connections before the worker takes traffic so the first
+    # requests don't pay for connection setup. Services opt in by defining
+    # warm_up() in app.py.
+    warm_up = getattr(sys.modules.get("app"), "warm_up", None)
+    if warm_up is None:
+        return
+    try:
+        warm_up()
+    except Exception as e:
+        worker.log.warning("warm_up failed in worker %s: %s", worker.pid, e)
@@ -0,0 +1,171 @@
+"""Duplicate suppression for notification endpoints.
+
+A request is identified by its Idempotency-Key header or, when the caller
+doesn't send one, by a hash of its JSON body (recipient and content). The
+first request with a given key runs; repeats inside the window get the
+stored response back without touching the provider.
+
+Completed keys are cached in a bounded in-process LRU in front of a Mongo
+collection whose unique _id makes the claim atomic across workers and
+replicas, and whose TTL index removes expired keys.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from flask import jsonify, make_response, request
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+class IdempotencyStore:
+    def __init__(self, collection, key_ttl=86400, content_ttl=600, lock_timeout=60, cache_size=10000):
+        self.collection = collection
+        self.key_ttl = key_ttl
+        self.content_ttl = content_ttl
+        self.lock_timeout = lock_timeout
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()  # key -> (expires_at, (status_code, body))
+        self._lock = threading.Lock()
+        self._indexed = False
+
+        self.replays = 0
+        self.conflicts = 0
+
+    @classmethod
+    def from_env(cls, collection):
+        return cls(
+            collection,
+            key_ttl=int(os.getenv("IDEMPOTENCY_KEY_TTL", 86400)),
+            content_ttl=int(os.getenv("IDEMPOTENCY_CONTENT_TTL", 600)),
+            lock_timeout=int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60)),
+            cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000)),
+        )
+
+    def idempotent(self, view):
+        """Route decorator; must sit below @app.route."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key, ttl = self._request_key()
+            state, stored = self.begin(key)
+
+            if state == DONE:
+                status_code, body = stored
+                response = make_response(jsonify(body), status_code)
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            if state == IN_PROGRESS:
+                return jsonify({"error": "A request with this idempotency key is already in progress"}), 409
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                self.release(key)
+                raise
+
+            # Only successful sends are remembered; failures, and partial
+            # failures (207), may be retried
+            if response.status_code < 300 and response.status_code != 207:
+                self.complete(key, response.status_code, response.get_json(silent=True), ttl)
+            else:
+                self.release(key)
+            return response
+
+        return wrapper
+
+    def begin(self, key):
+        """Claims the key. Returns ("new", None), (DONE, (status, body)) or (IN_PROGRESS, None)."""
+        now = datetime.now(timezone.utc)
+
+        cached = self._cache_get(key, now)
+        if cached is not None:
+            self.replays += 1
+            return DONE, cached
+
+        self._ensure_index()
+        claim = {"_id": key, "state": IN_PROGRESS, "expires_at": now + timedelta(seconds=self.lock_timeout)}
+        try:
+            self.collection.insert_one(claim)
+            return "new", None
+        except DuplicateKeyError:
+            pass
+
+        # Someone holds the key; take it over only if it has expired
+        taken = self.collection.find_one_and_replace({"_id": key, "expires_at": {"$lte": now}}, claim)
+        if taken is not None:
+            return "new", None
+
+        doc = self.collection.find_one({"_id": key})
+        if doc is None:
+            return self.begin(key)
+        if doc["state"] == DONE:
+            stored = (doc["status_code"], doc["body"])
+            self._cache_put(key, _aware(doc["expires_at"]), stored)
+            self.replays += 1
+            return DONE, stored
+
+        self.conflicts += 1
+        return IN_PROGRESS, None
+
+    def complete(self, key, status_code, body, ttl):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        self.collection.update_one({"_id": key}, {"$set": {
+            "state": DONE,
+            "status_code": status_code,
+            "body": body,
+            "expires_at": expires_at,
+        }})
+        self._cache_put(key, expires_at, (status_code, body))
+
+    def release(self, key):
+        self.collection.delete_one({"_id": key, "state": IN_PROGRESS})
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self._cache), "replays": self.replays, "conflicts": self.conflicts}
+
+    def _request_key(self):
+        header = request.headers.get("Idempotency-Key")
+        if header:
+            return f"{request.path}:key:{header}", self.key_ttl
+
+        payload = json.dumps(request.get_json(silent=True), sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        return f"{request.path}:body:{digest}", self.content_ttl
+
+    def _ensure_index(self):
+        if not self._indexed:
+            self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+            self._indexed = True
+
+    def _cache_get(self, key, now):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, stored = entry
+            if expires_at <= now:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return stored
+
+    def _cache_put(self, key, expires_at, stored):
+        with self._lock:
+            self._cache[key] = (expires_at, stored)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def _aware(value):
+    # pymongo returns naive datetimes in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
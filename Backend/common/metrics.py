@@ -0,0 +1,270 @@
+"""Prometheus-style metrics for the Backend services.
+
+instrument(app, service) records, for every request:
+
+    http_requests_total{method,route,status}             counter
+    http_request_duration_seconds{method,route,status}   histogram
+    http_requests_in_flight                               gauge
+
+and serves everything at GET /metrics in the Prometheus text format.
+Sub-steps (provider calls, pricing, password hashing) are timed with
+`with timer("name"):` or `@timed("name")` into
+step_duration_seconds{step,outcome}. MongoPool (common/mongo.py) times
+every Mongo command (insert, find, ...) into
+mongo_command_duration_seconds{command,outcome} without touching the
+call sites.
+
+Recording is lock-free: each thread writes to its own shard, a plain
+dict, and only /metrics takes the lock to add the shards up. Shards of
+finished threads are folded into one retired shard, so short-lived
+threads don't pile up. See benchmarks/metrics_overhead.py for the cost
+per request.
+
+Under gunicorn every worker keeps its own registry; /metrics reports the
+worker that answered, labelled worker="<pid>".
+"""
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response
+
+# Upper bounds in seconds; the same buckets serve requests, steps and Mongo
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ThreadMarker:
+    """Lives in a thread's local storage; collected when the thread ends."""
+
+    __slots__ = ("__weakref__",)
+
+
+class Registry:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.labels = {}  # added to every series, e.g. service
+        self._families = {}  # name -> (type, help, count_of)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def describe(self, name, kind, help_text, count_of=None):
+        """count_of: a counter rendered from the _count of that histogram, so it costs nothing to record."""
+        self._families[name] = (kind, help_text, count_of)
+
+    # -- recording (hot path, no locks) --
+
+    def observe(self, name, labels, value):
+        """Adds one observation to a histogram; labels is a tuple of (name, value) pairs."""
+        shard = self._shard()
+        key = (name, labels)
+        row = shard.get(key)
+        if row is None:
+            row = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def inc(self, name, labels, amount=1):
+        """Adds to a counter or gauge (negative amounts for gauges)."""
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            pass
+        shard = self._local.shard = {}
+        marker = self._local.marker = _ThreadMarker()
+        weakref.finalize(marker, self._retire, shard)
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            # By identity: list.remove() compares with ==, and two idle shards can be equal
+            self._shards = [s for s in self._shards if s is not shard]
+            _merge(self._retired, shard)
+
+    # -- exposition --
+
+    def collect(self):
+        """Returns {(name, labels): value} summed over all threads."""
+        totals = {}
+        with self._lock:
+            _merge(totals, self._retired)
+            for shard in self._shards:
+                # copy() is atomic under the GIL, iterating the live dict is not
+                _merge(totals, shard.copy())
+        return totals
+
+    def render(self):
+        families = {}
+        for (name, labels), value in self.collect().items():
+            families.setdefault(name, []).append((labels, value))
+
+        base = tuple(self.labels.items()) + (("worker", str(os.getpid())),)
+        lines = []
+        for name, (kind, help_text, count_of) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            series = families.get(name, [])
+            if count_of is not None:
+                series = [(labels, sum(value[:-1])) for labels, value in families.get(count_of, ())]
+            for labels, value in sorted(series):
+                labels = base + labels
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_bound(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(into, shard):
+    for key, value in shard.items():
+        if isinstance(value, list):
+            total = into.get(key)
+            into[key] = list(value) if total is None else [a + b for a, b in zip(total, value)]
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+REGISTRY = Registry()
+REGISTRY.describe("http_requests_total", "counter", "Requests handled, by route, method and status.",
+                  count_of="http_request_duration_seconds")
+REGISTRY.describe("http_request_duration_seconds", "histogram", "Time to handle a request, by route, method and status.")
+REGISTRY.describe("http_requests_in_flight", "gauge", "Requests being handled right now.")
+REGISTRY.describe("step_duration_seconds", "histogram", "Time spent in a sub-step of a request, e.g. a provider call.")
+
+
+# -- sub-step timing --
+
+class _StepTimer:
+    __slots__ = ("step", "started")
+
+    def __init__(self, step):
+        self.step = step
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        REGISTRY.observe("step_duration_seconds", (("step", self.step), ("outcome", "error" if exc_type else "ok")),
+                         elapsed)
+
+
+def timer(step):
+    """Context manager timing the block into step_duration_seconds{step=...}."""
+    return _StepTimer(step)
+
+
+def timed(step):
+    """Decorator version of timer()."""
+    ok = (("step", step), ("outcome", "ok"))
+    error = (("step", step), ("outcome", "error"))
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                REGISTRY.observe("step_duration_seconds", error, time.perf_counter() - started)
+                raise
+            REGISTRY.observe("step_duration_seconds", ok, time.perf_counter() - started)
+            return result
+        return wrapper
+    return decorator
+
+
+# -- Flask --
+
+class _RequestMetrics:
+    """WSGI middleware around app.wsgi_app.
+
+    Cheaper than before/after_request hooks: no hook dispatch and no
+    request-context proxies. The route is read from the request object
+    that instrument()'s request class leaves in the environ, after Flask
+    has matched it.
+    """
+
+    def __init__(self, wsgi_app, registry):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        status = "500"
+
+        def record_status(status_line, headers, *exc_info):
+            nonlocal status
+            status = status_line[:3]
+            return start_response(status_line, headers, *exc_info)
+
+        shard = self.registry._shard()
+        shard[_IN_FLIGHT] = shard.get(_IN_FLIGHT, 0) + 1
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, record_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            shard[_IN_FLIGHT] -= 1
+            # The rule, not the URL, so /email-status/<id> stays one series
+            rule = getattr(environ.pop(_REQUEST_KEY, None), "url_rule", None)
+            labels = (
+                ("method", environ.get("REQUEST_METHOD", "")),
+                ("route", rule.rule if rule is not None else "unmatched"),
+                ("status", status),
+            )
+            self.registry.observe("http_request_duration_seconds", labels, elapsed)
+
+
+_IN_FLIGHT = ("http_requests_in_flight", ())
+_REQUEST_KEY = "metrics.request"
+
+
+def instrument(app, service, path="/metrics"):
+    """Records every request of `app` and serves the registry at `path`."""
+    REGISTRY.labels["service"] = service
+
+    class TrackedRequest(app.request_class):
+        def __init__(self, environ, *args, **kwargs):
+            super().__init__(environ, *args, **kwargs)
+            # Flask clears werkzeug's own reference when the request ends
+            environ[_REQUEST_KEY] = self
+
+    app.request_class = TrackedRequest
+    app.wsgi_app = _RequestMetrics(app.wsgi_app, REGISTRY)
+
+    @app.route(path, methods=["GET"])
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
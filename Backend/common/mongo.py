@@ -0,0 +1,186 @@
+"""Shared MongoDB client for the Backend services.
+
+The URI and pool settings come from the environment:
+
+    MONGO_URI                          mongodb://host.docker.internal:27017
+    MONGO_MAX_POOL_SIZE                connections per worker process (50)
+    MONGO_MIN_POOL_SIZE                connections kept open when idle (0)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS        longest a request waits for a free connection (1000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS  longest a request waits for a reachable server (2000)
+    MONGO_CONNECT_TIMEOUT_MS           TCP connect timeout (2000)
+    MONGO_SOCKET_TIMEOUT_MS            longest a single operation may take (10000)
+    MONGO_WRITE_CONCERN                w for writes, e.g. 1 or majority (1)
+
+The short timeouts make a slow or unreachable Mongo fail requests within
+about two seconds with a 503 (see mongo_unavailable) instead of piling them
+up behind the 30 second driver defaults.
+
+The client is created with connect=False on first use, so no sockets or
+monitor threads exist until a worker process (forked by gunicorn) actually
+talks to Mongo. Every command is timed into the service's /metrics
+(mongo_command_duration_seconds, see common/metrics.py).
+"""
+import os
+import threading
+import time
+
+import pymongo
+from flask import jsonify
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+from common.metrics import REGISTRY
+
+DEFAULT_URI = "mongodb://host.docker.internal:27017"
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so utilization can be reported."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.checkout_wait_total = 0.0
+        self._started = {}  # thread id -> checkout start
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_checkout_wait_ms": round(self.checkout_wait_total / self.checkouts * 1000, 3)
+                if self.checkouts else 0,
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        self._started[threading.get_ident()] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = self._started.pop(threading.get_ident(), None)
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            if started is not None:
+                self.checkout_wait_total += time.perf_counter() - started
+
+    def connection_check_out_failed(self, event):
+        self._started.pop(threading.get_ident(), None)
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    # Events the stats don't need
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Times every Mongo command from the driver's own measurement."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        REGISTRY.observe("mongo_command_duration_seconds", (("command", event.command_name), ("outcome", "ok")),
+                         event.duration_micros / 1e6)
+
+    def failed(self, event):
+        REGISTRY.observe("mongo_command_duration_seconds", (("command", event.command_name), ("outcome", "error")),
+                         event.duration_micros / 1e6)
+
+
+REGISTRY.describe("mongo_command_duration_seconds", "histogram", "Time for a Mongo command as reported by the driver.")
+
+
+class MongoPool:
+    def __init__(self, uri=DEFAULT_URI, max_pool_size=50, min_pool_size=0, wait_queue_timeout_ms=1000,
+                 server_selection_timeout_ms=2000, connect_timeout_ms=2000, socket_timeout_ms=10000,
+                 write_concern="1"):
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.options = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "waitQueueTimeoutMS": wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": server_selection_timeout_ms,
+            "connectTimeoutMS": connect_timeout_ms,
+            "socketTimeoutMS": socket_timeout_ms,
+            "w": int(write_concern) if str(write_concern).isdigit() else write_concern,
+        }
+        self.stats = PoolStats()
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            uri=os.getenv("MONGO_URI", DEFAULT_URI),
+            max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+            min_pool_size=int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+            wait_queue_timeout_ms=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 1000)),
+            server_selection_timeout_ms=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 2000)),
+            connect_timeout_ms=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 2000)),
+            socket_timeout_ms=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000)),
+            write_concern=os.getenv("MONGO_WRITE_CONCERN", "1"),
+        )
+
+    @property
+    def client(self):
+        # One client per process; a client inherited across fork is not reused
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.stats = PoolStats()
+                    self._client = pymongo.MongoClient(
+                        self.uri, connect=False, event_listeners=[self.stats, MongoCommandTimer()], **self.options
+                    )
+                    self._pid = os.getpid()
+        return self._client
+
+    def pool_stats(self):
+        return {"max_pool_size": self.max_pool_size, **self.stats.snapshot()}
+
+    def health(self):
+        """Readiness check for /healthz: returns (body, status code)."""
+        started = time.perf_counter()
+        try:
+            self.client.admin.command("ping")
+        except PyMongoError as e:
+            return {"status": "unavailable", "error": str(e), "pool": self.pool_stats()}, 503
+        ping_ms = round((time.perf_counter() - started) * 1000, 2)
+        return {"status": "ok", "ping_ms": ping_ms, "pool": self.pool_stats()}, 200
+
+
+def mongo_unavailable(error):
+    """Flask error handler: Mongo unreachable or the pool exhausted -> 503."""
+    print(f"Mongo unavailable: {error}")
+    return jsonify({"error": "Database unavailable, try again shortly"}), 503
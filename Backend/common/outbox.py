@@ -0,0 +1,233 @@
+"""Durable outbox shared by the notification services.
+
+email-service queues emails here in EMAIL_DELIVERY_MODE=outbox, and
+sms-service queues every /send-sms-bulk message, so a request returns
+202 at once and worker threads deliver at the provider's pace.
+"""
+import atexit
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+
+class Outbox:
+    """Durable message queue backed by a Mongo collection.
+
+    Routes insert a "pending" document (the message's fields plus `kind`)
+    and return straight away. A pool of
+    worker threads claims documents one at a time with find_one_and_update,
+    calls `deliver(doc)` (which returns the provider message id) and retries
+    failures with exponential backoff until `max_attempts` is reached.
+    A claim is a lease: if a worker dies mid-send the document becomes
+    claimable again once `lease` seconds have passed.
+
+    `permanent(error)` decides which delivery errors fail the document at
+    once; by default an error with a `status` of 4xx other than 429 (e.g.
+    common.providers.ProviderError for a rejected address).
+    Once a message is delivered, recording it as "sent" is retried until it
+    sticks, so a Mongo blip can't get a delivered message sent again.
+
+    `on_final(doc, message_id, error)` runs once per document when it ends up
+    "sent" or "failed".
+    """
+
+    def __init__(self, collection, deliver, on_final=None, name="outbox", permanent=None, workers=4,
+                 max_attempts=5, backoff_base=2.0, backoff_max=300.0, lease=120.0, poll_interval=1.0):
+        self.collection = collection
+        self.name = name
+        self.permanent = permanent or is_permanent
+        self.deliver = deliver
+        self.on_final = on_final
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.poll_interval = poll_interval
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    @classmethod
+    def from_env(cls, prefix, collection, deliver, on_final=None, permanent=None, workers=4):
+        """Settings from <prefix>_WORKERS, <prefix>_MAX_ATTEMPTS, ... e.g. prefix EMAIL_OUTBOX."""
+        return cls(
+            collection,
+            deliver,
+            on_final,
+            name=prefix.lower().replace("_", "-"),
+            permanent=permanent,
+            workers=int(os.getenv(f"{prefix}_WORKERS", workers)),
+            max_attempts=int(os.getenv(f"{prefix}_MAX_ATTEMPTS", 5)),
+            backoff_base=float(os.getenv(f"{prefix}_BACKOFF", 2.0)),
+            backoff_max=float(os.getenv(f"{prefix}_BACKOFF_MAX", 300)),
+            lease=float(os.getenv(f"{prefix}_LEASE", 120)),
+            poll_interval=float(os.getenv(f"{prefix}_POLL_INTERVAL", 1.0)),
+        )
+
+    def start(self):
+        try:
+            self.collection.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        except PyMongoError as e:
+            # Mongo down at boot; the workers keep polling until it's back
+            print(f"{self.name} could not create its index: {e}")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def enqueue(self, kind, message, extra=None):
+        """Queues one message, a dict of its fields (e.g. to, subject, body); returns its id."""
+        result = self.collection.insert_one(self._new_doc(kind, message, extra))
+        self._wake.set()
+        return str(result.inserted_id)
+
+    def enqueue_many(self, kind, messages):
+        """Queues message dicts with one insert_many; returns their ids."""
+        if not messages:
+            return []
+        result = self.collection.insert_many([self._new_doc(kind, message) for message in messages])
+        self._wake.set()
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    def _new_doc(self, kind, message, extra=None):
+        now = datetime.now(timezone.utc)
+        return {
+            **message,
+            "kind": kind,
+            "extra": extra or {},
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now,
+        }
+
+    def status(self, message_id):
+        try:
+            doc = self.collection.find_one({"_id": ObjectId(message_id)})
+        except InvalidId:
+            raise ValueError("Invalid message id")
+        if doc is None:
+            return None
+
+        return {
+            "id": message_id,
+            "status": doc["status"],
+            "attempts": doc["attempts"],
+            "message_id": doc.get("message_id"),
+            "error": doc.get("error"),
+            "created_at": _isoformat(doc.get("created_at")),
+            "next_attempt_at": _isoformat(doc.get("next_attempt_at")) if doc["status"] == "pending" else None,
+            "finished_at": _isoformat(doc.get("finished_at")),
+        }
+
+    def _claim(self):
+        now = datetime.now(timezone.utc)
+        return self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "claimed_until": {"$lte": now}},
+            ]},
+            {
+                "$set": {"status": "sending", "claimed_until": now + timedelta(seconds=self.lease)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                doc = self._claim()
+            except Exception as e:
+                print(f"{self.name} claim failed: {e}")
+                doc = None
+
+            if doc is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            try:
+                self._process(doc)
+            except Exception as e:
+                # e.g. Mongo went away while rescheduling; the lease brings the doc back
+                print(f"{self.name} could not process {doc['_id']}: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _process(self, doc):
+        try:
+            message_id = self.deliver(doc)
+        except Exception as e:
+            self._failed(doc, str(e), self.permanent(e))
+            return
+
+        self._mark_sent(doc, message_id)
+        self._finalize(doc, message_id, None)
+
+    def _mark_sent(self, doc, message_id):
+        delay = 0.5
+        while True:
+            try:
+                self.collection.update_one({"_id": doc["_id"]}, {
+                    "$set": {"status": "sent", "message_id": message_id, "finished_at": datetime.now(timezone.utc)},
+                    "$unset": {"claimed_until": "", "error": ""},
+                })
+                return
+            except Exception as e:
+                # Already delivered: giving up would let the lease expire and send it again
+                print(f"{self.name} could not mark {doc['_id']} sent, retrying in {delay:.1f}s: {e}")
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, 5.0)
+
+    def _failed(self, doc, error, permanent=False):
+        now = datetime.now(timezone.utc)
+
+        if permanent or doc["attempts"] >= self.max_attempts:
+            self.collection.update_one({"_id": doc["_id"]}, {
+                "$set": {"status": "failed", "error": error, "finished_at": now},
+                "$unset": {"claimed_until": ""},
+            })
+            self._finalize(doc, None, error)
+            return
+
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (doc["attempts"] - 1))
+        delay *= random.uniform(0.8, 1.2)
+        self.collection.update_one({"_id": doc["_id"]}, {
+            "$set": {"status": "pending", "error": error, "next_attempt_at": now + timedelta(seconds=delay)},
+            "$unset": {"claimed_until": ""},
+        })
+
+    def _finalize(self, doc, message_id, error):
+        if self.on_final is None:
+            return
+        try:
+            self.on_final(doc, message_id, error)
+        except Exception as e:
+            print(f"{self.name} on_final failed for {doc['_id']}: {e}")
+
+
+def is_permanent(error):
+    # A 4xx other than 429 won't succeed on retry
+    status = getattr(error, "status", None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
@@ -0,0 +1,15 @@
+"""Errors shared by the notification transports (email, sms and push).
+
+Each service's transport.py wraps its provider's own exceptions (Gmail
+HttpError, TwilioRestException, PusherError, stub HTTP errors) in
+ProviderError, so retry and failure handling can look at one status.
+"""
+
+
+class ProviderError(Exception):
+    """The provider rejected or failed a call; status is the HTTP status if known."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
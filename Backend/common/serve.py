@@ -0,0 +1,34 @@
+"""Entry point shared by every Backend service image.
+
+APP_MODE=dev (default) runs `python app.py`, i.e. Flask's development server
+with the reloader. APP_MODE=prod runs the same app under gunicorn using
+common/gunicorn_conf.py.
+"""
+import multiprocessing
+import os
+import sys
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn_conf.py")
+
+
+def worker_count():
+    """How many processes serve the app, e.g. to split a per-service limit between them."""
+    if os.getenv("APP_MODE", "dev").lower() != "prod":
+        return 1
+    # Same default as gunicorn_conf.py
+    return int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+
+def main():
+    mode = os.getenv("APP_MODE", "dev").lower()
+
+    if mode == "prod":
+        os.execvp("gunicorn", ["gunicorn", "-c", CONF_PATH, "app:app"])
+    elif mode == "dev":
+        os.execv(sys.executable, [sys.executable, "app.py"])
+    else:
+        sys.exit(f"Unknown APP_MODE {mode!r}, expected 'dev' or 'prod'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Signed access tokens shared by the Backend services.
+
+auth-service signs short-lived access tokens and longer-lived refresh tokens
+with Ed25519 (JWT, alg EdDSA). Any service can check a token locally with
+TokenVerifier: public keys are taken from AUTH_PUBLIC_KEYS or fetched once
+from auth-service's JWKS endpoint (AUTH_JWKS_URL) and cached, so no call to
+auth is needed per request. Tokens that verified are remembered until they
+expire, so a client's repeat requests skip the signature check.
+
+Keys are named by a key id (kid) carried in each token's header. To rotate,
+add a new key to AUTH_SIGNING_KEYS and point AUTH_SIGNING_KID at it; keep the
+old key listed until the tokens it signed have expired. Verifiers pick up an
+unknown kid by refetching the JWKS.
+
+    python -m common.tokens   # prints a new "kid:seed" signing key
+"""
+import base64
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from flask import g, jsonify, request
+
+ALGORITHM = "EdDSA"
+DEFAULT_ISSUER = "auth-service"
+
+
+class InvalidToken(Exception):
+    """The token is malformed, expired, of the wrong type or signed by an unknown key."""
+
+
+def _b64decode(value):
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _parse_keys(spec, load):
+    # "kid1:base64,kid2:base64"
+    keys = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, _, encoded = item.partition(":")
+        if not encoded:
+            raise ValueError(f"Key {kid!r} must be written as kid:base64")
+        keys[kid] = load(_b64decode(encoded))
+    return keys
+
+
+def load_private_keys(spec):
+    return _parse_keys(spec, Ed25519PrivateKey.from_private_bytes)
+
+
+def load_public_keys(spec):
+    return _parse_keys(spec, Ed25519PublicKey.from_public_bytes)
+
+
+def _public_bytes(public_key):
+    return public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+
+class TokenIssuer:
+    """Signs access/refresh token pairs with the active key."""
+
+    def __init__(self, keys, active_kid=None, issuer=DEFAULT_ISSUER, access_ttl=900, refresh_ttl=7 * 86400):
+        if not keys:
+            raise ValueError("At least one signing key is required")
+        self.keys = keys
+        self.active_kid = active_kid or next(iter(keys))
+        if self.active_kid not in keys:
+            raise ValueError(f"Signing key {self.active_kid!r} is not in the key list")
+        self.issuer = issuer
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+
+    @classmethod
+    def from_env(cls):
+        keys = load_private_keys(os.getenv("AUTH_SIGNING_KEYS"))
+        if not keys:
+            # Tokens won't survive a restart or verify across workers/replicas
+            if os.getenv("APP_MODE", "dev").lower() == "prod":
+                raise ValueError("AUTH_SIGNING_KEYS must be set when APP_MODE=prod (see python -m common.tokens)")
+            print("AUTH_SIGNING_KEYS is not set; using a temporary signing key for this process")
+            keys = {"dev-" + secrets.token_hex(4): Ed25519PrivateKey.generate()}
+        return cls(
+            keys,
+            active_kid=os.getenv("AUTH_SIGNING_KID") or None,
+            issuer=os.getenv("AUTH_TOKEN_ISSUER", DEFAULT_ISSUER),
+            access_ttl=int(os.getenv("AUTH_ACCESS_TTL", 900)),
+            refresh_ttl=int(os.getenv("AUTH_REFRESH_TTL", 7 * 86400)),
+        )
+
+    def issue(self, subject, claims=None, token_type="access"):
+        now = int(time.time())
+        ttl = self.access_ttl if token_type == "access" else self.refresh_ttl
+        payload = dict(claims or {})
+        payload.update({
+            "iss": self.issuer,
+            "sub": subject,
+            "typ": token_type,
+            "iat": now,
+            "exp": now + ttl,
+            "jti": uuid.uuid4().hex,
+        })
+        return jwt.encode(payload, self.keys[self.active_kid], algorithm=ALGORITHM,
+                          headers={"kid": self.active_kid})
+
+    def issue_pair(self, subject, claims=None):
+        return {
+            "access_token": self.issue(subject, claims, "access"),
+            "refresh_token": self.issue(subject, claims, "refresh"),
+            "token_type": "Bearer",
+            "expires_in": self.access_ttl,
+        }
+
+    def public_keys(self):
+        return {kid: key.public_key() for kid, key in self.keys.items()}
+
+    def jwks(self):
+        return {"keys": [
+            {"kty": "OKP", "crv": "Ed25519", "alg": ALGORITHM, "use": "sig", "kid": kid,
+             "x": _b64encode(_public_bytes(public_key))}
+            for kid, public_key in self.public_keys().items()
+        ]}
+
+
+class TokenVerifier:
+    """Checks tokens locally against cached public keys."""
+
+    def __init__(self, keys=None, jwks_url=None, issuer=DEFAULT_ISSUER, leeway=5, refetch_interval=30, timeout=5,
+                 cache_size=10000):
+        self.jwks_url = jwks_url
+        self.issuer = issuer
+        self.leeway = leeway
+        self.refetch_interval = refetch_interval
+        self.timeout = timeout
+        self.cache_size = cache_size
+
+        self._keys = dict(keys or {})
+        self._lock = threading.Lock()
+        self._fetched_at = None
+        self._verified = OrderedDict()  # token -> claims
+        self._verified_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            keys=load_public_keys(os.getenv("AUTH_PUBLIC_KEYS")),
+            jwks_url=os.getenv("AUTH_JWKS_URL") or None,
+            issuer=os.getenv("AUTH_TOKEN_ISSUER", DEFAULT_ISSUER),
+            leeway=int(os.getenv("AUTH_TOKEN_LEEWAY", 5)),
+            cache_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000)),
+        )
+
+    def verify(self, token, token_type="access"):
+        """Returns the token's claims or raises InvalidToken."""
+        claims = self._cached(token)
+        if claims is None:
+            claims = self._decode(token)
+            self._remember(token, claims)
+
+        if claims.get("typ") != token_type:
+            raise InvalidToken(f"Not a {token_type} token")
+        return claims
+
+    def required(self, view):
+        """Route decorator: 401 unless the request has a valid Bearer token; claims go to g.user."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return jsonify({"error": "Missing bearer token"}), 401
+            try:
+                g.user = self.verify(token)
+            except InvalidToken as e:
+                return jsonify({"error": f"Invalid token: {e}"}), 401
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    def _cached(self, token):
+        with self._verified_lock:
+            claims = self._verified.get(token)
+            if claims is None:
+                return None
+            if claims["exp"] + self.leeway <= time.time():
+                del self._verified[token]
+                return None
+            self._verified.move_to_end(token)
+            return claims
+
+    def _remember(self, token, claims):
+        with self._verified_lock:
+            self._verified[token] = claims
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    def _decode(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+
+        key = self._key(kid)
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[ALGORITHM],
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+        return claims
+
+    def _key(self, kid):
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: auth may have rotated keys, so refetch (rate limited)
+        if self.jwks_url:
+            with self._lock:
+                now = time.monotonic()
+                if kid not in self._keys and (
+                        self._fetched_at is None or now - self._fetched_at >= self.refetch_interval):
+                    self._fetched_at = now
+                    try:
+                        self._keys.update(self._fetch_jwks())
+                    except Exception as e:
+                        print(f"Could not fetch token keys from {self.jwks_url}: {e}")
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise InvalidToken(f"Unknown signing key {kid!r}")
+        return key
+
+    def _fetch_jwks(self):
+        with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+            document = json.load(response)
+        return {
+            jwk["kid"]: Ed25519PublicKey.from_public_bytes(_b64decode(jwk["x"]))
+            for jwk in document.get("keys", [])
+            if jwk.get("kty") == "OKP" and jwk.get("crv") == "Ed25519"
+        }
+
+
+if __name__ == "__main__":
+    private_key = Ed25519PrivateKey.generate()
+    seed = private_key.private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    )
+    kid = time.strftime("%Y%m%d") + "-" + secrets.token_hex(2)
+    print(f"AUTH_SIGNING_KEYS entry: {kid}:{_b64encode(seed)}")
+    print(f"AUTH_PUBLIC_KEYS entry:  {kid}:{_b64encode(_public_bytes(private_key.public_key()))}")
@@ -1,48 +1,112 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from common.idempotency import IdempotencyStore
+from common.metrics import instrument
+from common.mongo import MongoPool, mongo_unavailable
+from common.outbox import Outbox
+from pymongo.errors import ConnectionFailure
 import os
-import base64
-import pymongo
-from email.mime.text import MIMEText
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from email_templates import offer_rows, render
+from mime_message import MimeBuilder
+from transport import create_transport
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True, origins=["http://localhost:3000","http://159.223.171.199:56300", "http://localhost:8501", "http://localhost:8000" ])
 
-# MongoDB
-client = pymongo.MongoClient("mongodb://host.docker.internal:27017")
+# Request counts, latencies and sub-step timings at GET /metrics (see common/metrics.py)
+instrument(app, "email")
+
+# MongoDB, pooled and with fail-fast timeouts (MONGO_* variables, see common/mongo.py)
+mongo = MongoPool.from_env()
+client = mongo.client
+app.register_error_handler(ConnectionFailure, mongo_unavailable)
 db = client["email_db"]
 emails = db["email_notification"]
+outbox_col = db["email_outbox"]
+
+# Repeated sends (same Idempotency-Key, or same body within the window)
+# get the first response back instead of another provider call
+dedupe = IdempotencyStore.from_env(db["idempotency_keys"])
+
+# Create a new database and collection for this client
+suds_db = client["suds_db"]
+suds_emails = suds_db["email"]
+
+# Called by gunicorn in each worker after fork (see common/gunicorn_conf.py)
+def warm_up():
+    client.admin.command("ping")
+    transport.warm_up()
 
 # Gmail API setup
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
-def get_gmail_service():
-    creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-    return build('gmail', 'v1', credentials=creds)
+# Gmail (or the provider stub, see transport.py), shared by all request threads
+transport = create_transport(SCOPES)
+
+# Header skeleton per sender, encoded once and reused for every send
+mime_builders = {"me": MimeBuilder("me")}
 
 def create_message(sender, to, subject, message_text):
-    message = MIMEText(message_text)
-    message['to'] = to
-    message['from'] = sender
-    message['subject'] = subject
-    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    return {'raw': raw}
+    builder = mime_builders.get(sender) or mime_builders.setdefault(sender, MimeBuilder(sender))
+    return builder.build(to, subject, message_text)
+
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", 50))
+MAX_BULK_EMAILS = int(os.getenv("MAX_BULK_EMAILS", 500))
+
+# Where each kind of email is logged, and whether the log records
+# status (and failures) or only successful sends
+EMAIL_LOGS = {
+    "booking": (emails, False),
+    "suds": (suds_emails, True),
+    "quote": (emails, False),
+    "offer": (emails, True),
+    "bulk": (emails, True),
+}
+
+def log_email(kind, to, subject, body, message_id=None, error=None, extra=None):
+    collection, tracks_status = EMAIL_LOGS[kind]
+    if error is not None and not tracks_status:
+        return
+
+    entry = {"to": to, "subject": subject, "body": body, **(extra or {})}
+    if tracks_status:
+        if error is None:
+            entry.update({"status": "sent", "message_id": message_id})
+        else:
+            entry.update({"status": "failed", "error": error})
+    collection.insert_one(entry)
+
+# EMAIL_DELIVERY_MODE=outbox makes the send routes queue the email and
+# return 202; worker threads deliver it in the background
+def deliver_outbox_email(doc):
+    message = create_message("me", doc["to"], doc["subject"], doc["body"])
+    return transport.send(message)["id"]
+
+def finish_outbox_email(doc, message_id, error):
+    log_email(doc["kind"], doc["to"], doc["subject"], doc["body"], message_id, error, doc.get("extra"))
+
+outbox = Outbox.from_env("EMAIL_OUTBOX", outbox_col, deliver_outbox_email, finish_outbox_email)
+OUTBOX_ENABLED = os.getenv("EMAIL_DELIVERY_MODE", "sync").lower() == "outbox"
+if OUTBOX_ENABLED:
+    outbox.start()
+
+def queue_email(kind, to, subject, body, extra=None):
+    message_id = outbox.enqueue(kind, {"to": to, "subject": subject, "body": body}, extra)
+    return jsonify({"message": "Email queued", "id": message_id, "status": "pending"}), 202
+
+@app.route("/email-status/<message_id>", methods=["GET"])
+def email_status(message_id):
+    try:
+        status = outbox.status(message_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if status is None:
+        return jsonify({"error": "Unknown message id"}), 404
+    return jsonify(status), 200
 
 @app.route("/send-email", methods=["POST"])
+@dedupe.idempotent
 def send_email():
     data = request.json
     email = data.get("email")
@@ -54,13 +118,15 @@ def send_email():
     if not email:
         return jsonify({"error": "Recipient email missing"}), 400
 
-    subject = f"{ticket_type} Booking Confirmation"
-    body = f"Your {ticket_type.lower()} ticket to {destination} has been successfully booked!"
+    subject, body = render("booking", ticket_type=ticket_type, ticket_type_lower=str(ticket_type).lower(),
+                           destination=destination)
+
+    if OUTBOX_ENABLED:
+        return queue_email("booking", email, subject, body)
 
     try:
-        service = get_gmail_service()
         message = create_message("me", email, subject, body)
-        send_result = service.users().messages().send(userId="me", body=message).execute()
+        send_result = transport.send(message)
 
         emails.insert_one({
             "to": email,
@@ -72,11 +138,8 @@ def send_email():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Create a new database and collection for this client
-suds_db = client["suds_db"]
-suds_emails = suds_db["email"]
-
 @app.route("/send-suds-email", methods=["POST"])
+@dedupe.idempotent
 def send_suds_email():
     data = request.json
     email = data.get("email")
@@ -93,21 +156,23 @@ def send_suds_email():
     if not all([email, policy_id, user_id, policy_type, coverage_amount, premium, start_date, end_date]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    subject = "SUDS Policy Confirmation"
-    body = f"""\
-    Policy ID: {policy_id}
-    User ID: {user_id}
-    Policy Type: {policy_type}
-    Coverage Amount: ₹{coverage_amount}
-    Premium: ₹{premium}
-    Start Date: {start_date}
-    End Date: {end_date}
-    Thank you for choosing our services."""
+    subject, body = render(
+        "suds",
+        policy_id=policy_id,
+        user_id=user_id,
+        policy_type=policy_type,
+        coverage_amount=coverage_amount,
+        premium=premium,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    if OUTBOX_ENABLED:
+        return queue_email("suds", email, subject, body)
 
     try:
-        service = get_gmail_service()
         message = create_message("me", email, subject, body)
-        send_result = service.users().messages().send(userId="me", body=message).execute()
+        send_result = transport.send(message)
 
         suds_emails.insert_one({
             "to": email,
@@ -131,6 +196,7 @@ def send_suds_email():
         return jsonify({"error": str(e)}), 500
        
 @app.route("/send-quote-email", methods=["POST"])
+@dedupe.idempotent
 def send_quote_email():
     data = request.json
     to = data.get("to")
@@ -140,10 +206,14 @@ def send_quote_email():
     if not to or not subject or not body:
         return jsonify({"error": "Missing 'to', 'subject', or 'body' in request"}), 400
 
+    subject, body = render("quote", subject=subject, body=body)
+
+    if OUTBOX_ENABLED:
+        return queue_email("quote", to, subject, body)
+
     try:
-        service = get_gmail_service()
         message = create_message("me", to, subject, body)
-        send_result = service.users().messages().send(userId="me", body=message).execute()
+        send_result = transport.send(message)
 
         emails.insert_one({
             "to": to,
@@ -157,6 +227,7 @@ def send_quote_email():
     
 
 @app.route("/send-offer-email", methods=["POST"])
+@dedupe.idempotent
 def send_offer_email():
     data = request.json
     email = data.get("email")
@@ -167,31 +238,15 @@ def send_offer_email():
 
     print("📩 Sending personalized offers to:", email)
 
-    subject = "🎉 Exclusive Travel Offers Just for You!"
+    # One compiled row template rendered per offer (see email_templates.py)
+    subject, body = render("offer", offer_rows(offers))
 
-    # Construct the email body from offers
-    body_lines = ["Here are some exciting personalized travel deals just for you:\n"]
-    for idx, offer in enumerate(offers, 1):
-        destination = offer.get("destination", "Unknown")
-        offer_type = offer.get("offer_type", "Unknown Package")
-        price = offer.get("price_usd", 0)
-        discount = offer.get("discount_percent", 0)
-        description = offer.get("description", "")
-
-        line = (
-            f"{idx}. ✈️ {destination} — {offer_type}\n"
-            f"   • {description}\n"
-            f"   • Price: ${price}\n"
-            f"   • Discount: {discount}% OFF\n"
-        )
-        body_lines.append(line)
-
-    body = "\n".join(body_lines)
+    if OUTBOX_ENABLED:
+        return queue_email("offer", email, subject, body, {"offers": offers})
 
     try:
-        service = get_gmail_service()
         message = create_message("me", email, subject, body)
-        send_result = service.users().messages().send(userId="me", body=message).execute()
+        send_result = transport.send(message)
 
         # Log in MongoDB
         emails.insert_one({
@@ -217,5 +272,71 @@ def send_offer_email():
         return jsonify({"error": str(e)}), 500
 
 
+# Sends many emails in one call: messages are grouped into Gmail batch
+# requests of GMAIL_BATCH_SIZE and all log entries go out in one insert_many.
+# The status is 207 when some messages failed and 502 when none were sent;
+# neither is stored for replay, so a retry sends again.
+@app.route("/send-emails-bulk", methods=["POST"])
+@dedupe.idempotent
+def send_emails_bulk():
+    data = request.json or {}
+    messages = data.get("messages")
+
+    if not isinstance(messages, list) or not messages:
+        return jsonify({"error": "Messages list missing"}), 400
+    if len(messages) > MAX_BULK_EMAILS:
+        return jsonify({"error": f"At most {MAX_BULK_EMAILS} messages per request"}), 400
+
+    print("📧 Bulk email request received:", len(messages), "messages")
+
+    results = [None] * len(messages)
+    valid = []  # (index, to, subject, body)
+
+    for idx, item in enumerate(messages):
+        if not isinstance(item, dict) or not item.get("to") or not item.get("subject") or not item.get("body"):
+            results[idx] = {"index": idx, "status": "failed", "error": "Missing 'to', 'subject', or 'body'"}
+            continue
+        valid.append((idx, item["to"], item["subject"], item["body"]))
+
+    if OUTBOX_ENABLED:
+        ids = outbox.enqueue_many("bulk", [{"to": to, "subject": subject, "body": body} for _, to, subject, body in valid])
+        for (idx, to, _, _), message_id in zip(valid, ids):
+            results[idx] = {"index": idx, "to": to, "id": message_id, "status": "pending"}
+        return jsonify({"results": results, "queued": len(ids), "failed": len(messages) - len(ids)}), 202
+
+    log_entries = []
+    for start in range(0, len(valid), GMAIL_BATCH_SIZE):
+        chunk = valid[start:start + GMAIL_BATCH_SIZE]
+        batch = [create_message("me", to, subject, body) for _, to, subject, body in chunk]
+
+        try:
+            outcomes = transport.send_batch(batch)
+        except Exception as e:
+            outcomes = [(None, str(e))] * len(chunk)
+
+        for (idx, to, subject, body), (response, error) in zip(chunk, outcomes):
+            entry = {"to": to, "subject": subject, "body": body}
+            if error is None:
+                results[idx] = {"index": idx, "to": to, "id": response["id"], "status": "sent"}
+                entry.update({"status": "sent", "message_id": response["id"]})
+            else:
+                results[idx] = {"index": idx, "to": to, "status": "failed", "error": error}
+                entry.update({"status": "failed", "error": error})
+            log_entries.append(entry)
+
+    if log_entries:
+        emails.insert_many(log_entries, ordered=False)
+
+    sent = sum(1 for r in results if r["status"] == "sent")
+    status = 200 if sent == len(messages) else 207 if sent else 502
+    return jsonify({"results": results, "sent": sent, "failed": len(messages) - sent}), status
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Readiness: Mongo reachable within the timeouts, plus pool utilization
+    body, status = mongo.health()
+    return jsonify(body), status
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0',port=5002, debug=True)
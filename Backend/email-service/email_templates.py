@@ -0,0 +1,149 @@
+"""Named email templates, compiled once at import.
+
+A template is str.format-style text. Compiling checks it, records its
+field names and turns it into a positional format string, so rendering
+is one C-level str.format call over the escaped values. Values are
+escaped before they are inserted: control characters (including CR/LF)
+become spaces, so a field can't add lines or headers. Fields marked
+`!m` (multi-line) keep their newlines.
+"""
+import re
+import string
+
+# Control characters other than tab (and, for multi-line values, newline)
+_INLINE = re.compile(r"[\x00-\x08\x0a-\x1f\x7f]")
+_MULTILINE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+
+
+class Escaped(str):
+    """Text that has already been escaped, e.g. rendered rows; escape() passes it through."""
+
+
+def escape(value, multiline=False):
+    if isinstance(value, Escaped):
+        return value
+    value = str(value)
+    if multiline:
+        if _MULTILINE.search(value) is None:
+            return value
+        return _MULTILINE.sub(" ", value.replace("\r\n", "\n"))
+    if _INLINE.search(value) is None:
+        return value
+    return _INLINE.sub(" ", value)
+
+
+class Template:
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.fields = []
+        self._placeholders = []
+
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion not in (None, "m"):
+                raise ValueError(f"Template {name!r}: unsupported placeholder {{{field}}}")
+            parts.append(f"{{{len(self.fields)}}}")
+            self.fields.append(field)
+            self._placeholders.append((field, conversion == "m"))
+        self._format = "".join(parts).format
+        # Values can be checked after rendering when none of them may add lines
+        self._newlines = None if any(m for _, m in self._placeholders) else source.count("\n")
+
+    def render(self, **values):
+        return self.render_map(values)
+
+    def render_map(self, values):
+        if self._newlines is not None:
+            text = self._format(*[values[field] for field in self.fields])
+            if _MULTILINE.search(text) is None and text.count("\n") == self._newlines:
+                return text
+        return self._format(*[escape(values[field], multiline) for field, multiline in self._placeholders])
+
+    def render_rows(self, rows, separator="\n"):
+        """Renders the template once per row and joins the results."""
+        if self._newlines is not None and rows:
+            render, fields = self._format, self.fields
+            text = separator.join([render(*[row[field] for field in fields]) for row in rows])
+            # One check over the whole text instead of escaping every value
+            expected = len(rows) * self._newlines + (len(rows) - 1) * separator.count("\n")
+            if _MULTILINE.search(text) is None and text.count("\n") == expected:
+                return Escaped(text)
+        return Escaped(separator.join([self.render_map(row) for row in rows]))
+
+
+class EmailTemplate:
+    """A subject and a body template, optionally with a row template repeated over a list."""
+
+    def __init__(self, name, subject, body, row=None, row_separator="\n"):
+        self.name = name
+        self.subject = Template(f"{name}.subject", subject)
+        self.body = Template(f"{name}.body", body)
+        self.row = Template(f"{name}.row", row) if row else None
+        self.row_separator = row_separator
+
+    def render(self, rows=None, **values):
+        """Returns (subject, body). With a row template, rendered rows are passed to the body as `rows`."""
+        if self.row is not None:
+            values["rows"] = self.row.render_rows(rows or [], self.row_separator)
+        return self.subject.render_map(values), self.body.render_map(values)
+
+
+TEMPLATES = {
+    "booking": EmailTemplate(
+        "booking",
+        subject="{ticket_type} Booking Confirmation",
+        body="Your {ticket_type_lower} ticket to {destination} has been successfully booked!",
+    ),
+    "suds": EmailTemplate(
+        "suds",
+        subject="SUDS Policy Confirmation",
+        body=(
+            "    Policy ID: {policy_id}\n"
+            "    User ID: {user_id}\n"
+            "    Policy Type: {policy_type}\n"
+            "    Coverage Amount: ₹{coverage_amount}\n"
+            "    Premium: ₹{premium}\n"
+            "    Start Date: {start_date}\n"
+            "    End Date: {end_date}\n"
+            "    Thank you for choosing our services."
+        ),
+    ),
+    "quote": EmailTemplate(
+        "quote",
+        subject="{subject}",
+        body="{body!m}",
+    ),
+    "offer": EmailTemplate(
+        "offer",
+        subject="🎉 Exclusive Travel Offers Just for You!",
+        body="Here are some exciting personalized travel deals just for you:\n\n{rows!m}",
+        row=(
+            "{idx}. ✈️ {destination} — {offer_type}\n"
+            "   • {description}\n"
+            "   • Price: ${price}\n"
+            "   • Discount: {discount}% OFF\n"
+        ),
+    ),
+}
+
+
+def render(kind, rows=None, **values):
+    return TEMPLATES[kind].render(rows, **values)
+
+
+def offer_rows(offers):
+    return [
+        {
+            "idx": idx,
+            "destination": offer.get("destination", "Unknown"),
+            "offer_type": offer.get("offer_type", "Unknown Package"),
+            "price": offer.get("price_usd", 0),
+            "discount": offer.get("discount_percent", 0),
+            "description": offer.get("description", ""),
+        }
+        for idx, offer in enumerate(offers, 1)
+    ]
@@ -0,0 +1,128 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+
+# Gmail accepts up to 100 calls per batch but recommends no more than 50
+MAX_BATCH_SIZE = 100
+
+
+class GmailClient:
+    """Process-wide Gmail client.
+
+    The API client is built once from the discovery document bundled with
+    google-api-python-client, so no network call is needed to create it.
+    token.json is read once; the access token is refreshed under a lock
+    shortly before it expires and written back to disk. httplib2 connections
+    are not thread-safe, so every thread executes requests through its own
+    authorized Http object that shares the same credentials.
+    """
+
+    def __init__(self, token_path, credentials_path, scopes, refresh_margin=300):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.scopes = scopes
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._creds = None
+        self._service = None
+
+    def send(self, message):
+        request = self.service().users().messages().send(userId="me", body=message)
+        return request.execute(http=self._http())
+
+    def send_batch(self, messages):
+        """Sends messages in one batch HTTP request.
+
+        Returns a (response, error) pair per message, in the same order.
+        """
+        if len(messages) > MAX_BATCH_SIZE:
+            raise ValueError(f"Gmail batches are limited to {MAX_BATCH_SIZE} calls")
+
+        results = [None] * len(messages)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, str(exception) if exception else None)
+
+        service = self.service()
+        batch = service.new_batch_http_request(callback=callback)
+        for index, message in enumerate(messages):
+            batch.add(service.users().messages().send(userId="me", body=message), request_id=str(index))
+        batch.execute(http=self._http())
+        return results
+
+    def service(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = build(
+                        "gmail", "v1",
+                        credentials=self._credentials(),
+                        static_discovery=True,
+                        cache_discovery=False,
+                    )
+        return self._service
+
+    def warm_up(self):
+        self.service()
+        self._credentials()
+
+    def _http(self):
+        creds = self._credentials()
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not creds:
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _credentials(self):
+        creds = self._creds
+        if creds is not None and not self._expiring(creds):
+            return creds
+
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load()
+            elif self._expiring(self._creds):
+                self._refresh(self._creds)
+            return self._creds
+
+    def _expiring(self, creds):
+        if creds.expiry is None:
+            return not creds.valid
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < self.refresh_margin
+
+    def _load(self):
+        creds = None
+        if os.path.exists(self.token_path):
+            creds = Credentials.from_authorized_user_file(self.token_path, self.scopes)
+
+        if creds and creds.refresh_token:
+            if self._expiring(creds):
+                self._refresh(creds)
+            return creds
+
+        if not creds or not creds.valid:
+            flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, self.scopes)
+            creds = flow.run_local_server(port=0)
+            self._save(creds)
+        return creds
+
+    def _refresh(self, creds):
+        creds.refresh(Request())
+        self._save(creds)
+
+    def _save(self, creds):
+        with open(self.token_path, "w") as token:
+            token.write(creds.to_json())
@@ -0,0 +1,59 @@
+"""Builds Gmail API `raw` messages from a prebuilt MIME header skeleton.
+
+Every message is a single text/plain UTF-8 part, so the Content-Type,
+MIME-Version and From lines are the same for every send and are encoded
+once. Per send only To, Subject and the body are encoded. Bodies go out
+as 8bit UTF-8 when every line fits the RFC 5322 limit, which skips a
+second base64 pass under the Gmail API's own, and as base64 otherwise.
+Encoded subjects and bodies are cached, so bulk sends of one text to
+many recipients encode the text once.
+"""
+import base64
+from email.header import Header
+from functools import lru_cache
+
+
+def _header_value(value):
+    # Headers can't carry newlines; non-ASCII goes out as an RFC 2047 word
+    value = " ".join(str(value).splitlines())
+    if value.isascii():
+        return value
+    return Header(value, "utf-8").encode()
+
+
+@lru_cache(maxsize=1024)
+def _encoded_subject(subject):
+    return f"subject: {_header_value(subject)}\n".encode()
+
+
+# Longest line allowed in an 8bit body, without the line break
+MAX_8BIT_LINE = 998
+
+
+@lru_cache(maxsize=64)
+def _encoded_body(body):
+    data = body.encode("utf-8")
+    if b"\r" not in data and b"\0" not in data and max(map(len, data.split(b"\n"))) <= MAX_8BIT_LINE:
+        return b"Content-Transfer-Encoding: 8bit\n", data
+    return b"Content-Transfer-Encoding: base64\n", base64.encodebytes(data)
+
+
+class MimeBuilder:
+    def __init__(self, sender="me"):
+        self.skeleton = (
+            'Content-Type: text/plain; charset="utf-8"\n'
+            "MIME-Version: 1.0\n"
+            f"from: {_header_value(sender)}\n"
+        ).encode()
+
+    def build(self, to, subject, body):
+        encoding, payload = _encoded_body(body)
+        message = b"".join([
+            self.skeleton,
+            encoding,
+            f"to: {_header_value(to)}\n".encode(),
+            _encoded_subject(subject),
+            b"\n",
+            payload,
+        ])
+        return {"raw": base64.urlsafe_b64encode(message).decode()}
@@ -0,0 +1,77 @@
+import os
+
+import requests
+from googleapiclient.errors import HttpError
+
+from common.metrics import timed
+from common.providers import ProviderError
+
+from gmail_client import GmailClient
+
+# EMAIL_TRANSPORT picks where emails go:
+#   gmail - the Gmail API (default)
+#   stub  - the local provider stub (Backend/provider-stub) at STUB_PROVIDER_URL,
+#           for load tests without a Google account
+
+
+class GmailTransport:
+    name = "gmail"
+
+    def __init__(self, client):
+        self.client = client
+
+    @timed("gmail_send")
+    def send(self, message):
+        try:
+            return self.client.send(message)
+        except HttpError as e:
+            raise ProviderError(str(e), e.resp.status, e.resp.get("retry-after")) from e
+
+    @timed("gmail_send_batch")
+    def send_batch(self, messages):
+        return self.client.send_batch(messages)
+
+    def warm_up(self):
+        self.client.warm_up()
+
+
+class StubEmailTransport:
+    name = "stub"
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @timed("stub_send")
+    def send(self, message):
+        response = self.session.post(f"{self.base_url}/gmail/send", json=message, timeout=self.timeout)
+        return _json_or_raise(response)
+
+    @timed("stub_send_batch")
+    def send_batch(self, messages):
+        response = self.session.post(f"{self.base_url}/gmail/batch", json={"messages": messages}, timeout=self.timeout)
+        results = _json_or_raise(response)["results"]
+        return [(None, r["error"]) if "error" in r else (r, None) for r in results]
+
+    def warm_up(self):
+        pass
+
+
+def _json_or_raise(response):
+    if response.status_code >= 400:
+        raise ProviderError(
+            f"Provider returned {response.status_code}: {response.text}",
+            response.status_code,
+            response.headers.get("Retry-After")
+        )
+    return response.json()
+
+
+def create_transport(scopes):
+    kind = os.getenv("EMAIL_TRANSPORT", "gmail").lower()
+    if kind == "gmail":
+        return GmailTransport(GmailClient("token.json", "credentials.json", scopes))
+    if kind == "stub":
+        return StubEmailTransport(os.getenv("STUB_PROVIDER_URL", "http://localhost:5099"))
+    raise ValueError(f"Unknown EMAIL_TRANSPORT {kind!r}, expected 'gmail' or 'stub'")
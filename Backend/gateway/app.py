@@ -0,0 +1,170 @@
+import asyncio
+import os
+
+from aiohttp import web
+
+from upstreams import Upstream, UpstreamError, forward_headers, response_headers
+
+# One origin for the frontend and external teams. Each service is routed
+# under its own prefix, e.g. POST /email/send-email -> email-service /send-email
+UPSTREAMS = {
+    "auth": Upstream.from_env("auth", "http://localhost:5000"),
+    "email": Upstream.from_env("email", "http://localhost:5002"),
+    "sms": Upstream.from_env("sms", "http://localhost:5003"),
+    "push": Upstream.from_env("push", "http://localhost:5004"),
+    "price": Upstream.from_env("price", "http://localhost:5005"),
+}
+
+# CORS is answered here once, for every route, instead of by each service
+ALLOWED_ORIGINS = {
+    o.strip() for o in os.getenv(
+        "GATEWAY_ALLOWED_ORIGINS",
+        "http://localhost:3000,http://159.223.171.199:56300,http://localhost:8501,http://localhost:8000",
+    ).split(",") if o.strip()
+}
+CORS_MAX_AGE = os.getenv("GATEWAY_CORS_MAX_AGE", "600")
+
+MAX_BODY_BYTES = int(os.getenv("GATEWAY_MAX_BODY_BYTES", 10 * 1024 * 1024))
+
+
+def cors_headers(request):
+    origin = request.headers.get("Origin")
+    if not origin or origin not in ALLOWED_ORIGINS:
+        return {}
+    return {
+        "Access-Control-Allow-Origin": origin,
+        "Access-Control-Allow-Credentials": "true",
+        "Vary": "Origin",
+    }
+
+
+@web.middleware
+async def cors(request, handler):
+    headers = cors_headers(request)
+    if request.method == "OPTIONS" and "Access-Control-Request-Method" in request.headers:
+        # Preflight: answered without a round trip to the service
+        if headers:
+            headers.update({
+                "Access-Control-Allow-Methods": "GET, POST, PUT, PATCH, DELETE, OPTIONS",
+                "Access-Control-Allow-Headers": request.headers.get("Access-Control-Request-Headers", "*"),
+                "Access-Control-Max-Age": CORS_MAX_AGE,
+            })
+        return web.Response(status=204, headers=headers)
+
+    try:
+        response = await handler(request)
+    except web.HTTPException as e:
+        # e.g. 404 for an unknown route; still readable by the browser
+        e.headers.update(headers)
+        raise
+    response.headers.update(headers)
+    return response
+
+
+async def proxy(request):
+    upstream = UPSTREAMS.get(request.match_info["service"])
+    if upstream is None:
+        return web.json_response({"error": "Unknown service"}, status=404)
+
+    headers = forward_headers(request.headers, request.remote or "", request.scheme, request.host)
+    body = await request.read() if request.can_read_body else None
+    try:
+        status, upstream_headers, payload = await upstream.request(
+            request.method, "/" + request.match_info["path"], headers=headers, body=body, params=request.query
+        )
+    except UpstreamError as e:
+        return web.json_response({"error": str(e)}, status=e.status)
+    return web.Response(status=status, headers=response_headers(upstream_headers), body=payload)
+
+
+# -- composite endpoints --
+
+async def call(name, path, payload, idempotency_key=None, deduped=False):
+    """One leg of a fan-out; failures become part of the result instead of raising.
+
+    deduped: the route is @dedupe.idempotent, so even without a key a
+    repeat of the same body is suppressed and the leg may be retried.
+    """
+    headers = {"Idempotency-Key": f"{idempotency_key}:{name}"} if idempotency_key else None
+    try:
+        status, body = await UPSTREAMS[name].post_json(path, payload, headers=headers, idempotent=deduped)
+    except UpstreamError as e:
+        return {"ok": False, "status": e.status, "error": str(e)}
+    return {"ok": 200 <= status < 300, "status": status, "body": body}
+
+
+async def book_notify(request):
+    """Sends the booking email, SMS and push notification concurrently.
+
+    Replaces the three sequential calls the booking page made. The result
+    has one entry per channel; the status is 200 when all succeeded, 207
+    when some did and 502 when none did. An Idempotency-Key from the client
+    is passed to the email and SMS legs as "<key>:<channel>". Without one
+    those services dedupe on the body, so a double click or a retry of the
+    same booking still sends each of them once.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.json_response({"error": "Invalid JSON body"}, status=400)
+    if not isinstance(data, dict):
+        return web.json_response({"error": "Invalid JSON body"}, status=400)
+
+    email = data.get("email")
+    phone = data.get("phone")
+    destination = data.get("destination")
+    ticket_type = data.get("ticketType")
+
+    if not email or not phone or not destination or not ticket_type:
+        return web.json_response({"error": "email, phone, destination and ticketType are required"}, status=400)
+
+    # Only the client's own key; a fresh one per call would defeat the body dedupe
+    key = request.headers.get("Idempotency-Key")
+    legs = {
+        "email": call("email", "/send-email",
+                      {"email": email, "destination": destination, "ticketType": ticket_type}, key, deduped=True),
+        "sms": call("sms", "/send-sms",
+                    {"phone": phone, "destination": destination, "ticketType": ticket_type}, key, deduped=True),
+        "push": call("push", "/send-push",
+                     {"message": data.get("message") or f"Book your return ticket to {destination} now!"}),
+    }
+    results = dict(zip(legs, await asyncio.gather(*legs.values())))
+
+    succeeded = sum(1 for r in results.values() if r["ok"])
+    status = 200 if succeeded == len(results) else 207 if succeeded else 502
+    return web.json_response({"results": results, "sent": succeeded, "failed": len(results) - succeeded},
+                             status=status)
+
+
+async def gateway_stats(request):
+    return web.json_response({name: upstream.stats() for name, upstream in UPSTREAMS.items()})
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok"})
+
+
+async def open_pools(app):
+    for upstream in UPSTREAMS.values():
+        await upstream.start()
+
+
+async def close_pools(app):
+    for upstream in UPSTREAMS.values():
+        await upstream.close()
+
+
+def create_app():
+    app = web.Application(middlewares=[cors], client_max_size=MAX_BODY_BYTES)
+    app.on_startup.append(open_pools)
+    app.on_cleanup.append(close_pools)
+
+    app.router.add_post("/book-notify", book_notify)
+    app.router.add_get("/gateway-stats", gateway_stats)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_route("*", "/{service}/{path:.*}", proxy)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="0.0.0.0", port=int(os.getenv("PORT", 8080)), access_log=None)
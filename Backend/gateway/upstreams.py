@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+
+import aiohttp
+from multidict import CIMultiDict
+
+# Headers that describe one hop, not the request, and are never passed on.
+# Origin is dropped too: the gateway answers CORS itself, so the services
+# see a same-origin call and add no CORS headers of their own.
+HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+    "transfer-encoding", "upgrade", "host", "content-length", "origin",
+}
+
+# Repeating these can't send anything twice
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class UpstreamError(Exception):
+    """The upstream could not be reached or did not answer in time."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class Upstream:
+    """One Backend service behind the gateway, with its own keep-alive pool.
+
+    keepalive_timeout should stay below the service's own keep-alive
+    (GUNICORN_KEEPALIVE, 5s) so the gateway drops idle connections before
+    the service does. A request that still hits a connection the service
+    just closed is retried once when that is safe: GET/HEAD/OPTIONS, a
+    request carrying an Idempotency-Key, or one to a route that dedupes by
+    body (see common/idempotency.py).
+    """
+
+    def __init__(self, name, base_url, pool_size=100, keepalive_timeout=4.0, timeout=15.0, connect_timeout=2.0):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.session = None
+
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls, name, default_url):
+        prefix = f"GATEWAY_{name.upper()}"
+        return cls(
+            name,
+            os.getenv(f"{prefix}_URL", default_url),
+            pool_size=int(os.getenv("GATEWAY_UPSTREAM_POOL_SIZE", 100)),
+            keepalive_timeout=float(os.getenv("GATEWAY_UPSTREAM_KEEPALIVE", 4)),
+            timeout=float(os.getenv("GATEWAY_UPSTREAM_TIMEOUT", 15)),
+            connect_timeout=float(os.getenv("GATEWAY_UPSTREAM_CONNECT_TIMEOUT", 2)),
+        )
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        # Responses are passed through as they are; no cookie jar, no decompression
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            auto_decompress=False,
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def request(self, method, path, headers=None, body=None, params=None, idempotent=False):
+        """Returns (status, headers, body); raises UpstreamError if there is no answer.
+
+        idempotent: the route suppresses repeats by itself (e.g. by a hash of
+        the body), so the request may be retried without a key.
+        """
+        self.requests += 1
+        retry = idempotent or method in SAFE_METHODS or "Idempotency-Key" in (headers or {})
+        url = f"{self.base_url}{path}"
+
+        while True:
+            try:
+                async with self.session.request(method, url, headers=headers, data=body, params=params,
+                                                allow_redirects=False) as response:
+                    return response.status, response.headers, await response.read()
+            except aiohttp.ServerDisconnectedError as e:
+                # Usually a pooled connection the service closed while idle
+                if retry:
+                    retry = False
+                    self.retries += 1
+                    continue
+                self.errors += 1
+                raise UpstreamError(f"{self.name} closed the connection: {e}", 502) from e
+            except asyncio.TimeoutError as e:
+                self.errors += 1
+                raise UpstreamError(f"{self.name} did not answer in time", 504) from e
+            except aiohttp.ClientError as e:
+                self.errors += 1
+                raise UpstreamError(f"{self.name} is unreachable: {e}", 502) from e
+
+    async def post_json(self, path, payload, headers=None, idempotent=False):
+        """POSTs JSON and returns (status, decoded body or None)."""
+        status, _, body = await self.request(
+            "POST", path, headers={"Content-Type": "application/json", **(headers or {})},
+            body=json.dumps(payload).encode(), idempotent=idempotent,
+        )
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, {"raw": body.decode("utf-8", "replace")}
+
+    def stats(self):
+        return {
+            "url": self.base_url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "pool_size": self.pool_size,
+        }
+
+
+def forward_headers(headers, client_ip, scheme, host):
+    """Request headers to send upstream, with X-Forwarded-* set by the gateway.
+
+    The gateway is the edge, so any X-Forwarded-For the client sent is
+    replaced rather than extended: services (e.g. auth's login throttling)
+    must not see addresses the client made up.
+    """
+    out = CIMultiDict((k, v) for k, v in headers.items() if k.lower() not in HOP_HEADERS)
+    out["X-Forwarded-For"] = client_ip
+    out["X-Forwarded-Proto"] = scheme
+    out["X-Forwarded-Host"] = host
+    return out
+
+
+def response_headers(headers):
+    """Upstream response headers to return, minus hop headers and the services' own CORS."""
+    return CIMultiDict(
+        (k, v) for k, v in headers.items()
+        if k.lower() not in HOP_HEADERS and not k.lower().startswith("access-control-")
+    )
+
@@ -1,18 +1,46 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+from common.metrics import instrument, timer
+from common.mongo import MongoPool, mongo_unavailable
+import numpy as np
+from price_log import create_price_log_writer
+from pricing_rules import RuleStore
+from quote_cache import QuoteCache
+from functools import lru_cache
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
 
-client = MongoClient("mongodb://host.docker.internal:27017")
+# Request counts, latencies and sub-step timings at GET /metrics (see common/metrics.py)
+instrument(app, "price")
+
+# MongoDB, pooled and with fail-fast timeouts (MONGO_* variables, see common/mongo.py)
+mongo = MongoPool.from_env()
+client = mongo.client
+app.register_error_handler(ConnectionFailure, mongo_unavailable)
 db = client["pricing_db"]
 price_collection = db["price_logs"]
 
-BASE_PRICE = 1000
-PEAK_MONTHS = [6, 12]  # June, December
-POPULAR_DESTINATIONS = ["delhi", "mumbai", "bangalore", "goa", "manali"]
+# Price logs are written in the background so routes don't wait on Mongo
+price_log = create_price_log_writer(price_collection)
+
+# Called by gunicorn in each worker after fork (see common/gunicorn_conf.py)
+def warm_up():
+    client.admin.command("ping")
+
+MAX_BATCH_SIZE = 500
+
+# Pricing constants and rules live in pricing_rules.json and are reloaded on change
+pricing_rules = RuleStore.from_env()
+
+# /get-price results depend only on (destination, ticketType, month, flightTime)
+quote_cache = QuoteCache.from_env()
+
+@lru_cache(maxsize=4096)
+def parse_flight_month(flight_date_str):
+    return datetime.strptime(flight_date_str, "%Y-%m-%d").month
 
 @app.route("/get-price", methods=["POST"])
 def get_price():
@@ -23,34 +51,24 @@ def get_price():
     flight_time = data.get("flightTime", "").lower()
 
     try:
-        flight_date = datetime.strptime(flight_date_str, "%Y-%m-%d")
-    except:
+        month = parse_flight_month(flight_date_str)
+    except (TypeError, ValueError):
         return jsonify({"error": "Invalid date format"}), 400
 
-    month = flight_date.month
-    price = BASE_PRICE
-
-    # Ticket type
-    if ticket_type == "business":
-        price *= 1.5
-
-    # Peak month
-    if month in PEAK_MONTHS:
-        price *= 1.2
+    rules = pricing_rules.get()
+    quote_cache.sync_version(rules.version)
 
-    # Flight time
-    if flight_time == "evening":
-        price *= 1.15
-    elif flight_time == "afternoon":
-        price *= 1.10
+    # The rules version is part of the key so a quote computed while the
+    # rules were being reloaded is never served under the new version
+    cache_key = (rules.version, destination, ticket_type, month, flight_time)
+    final_price = quote_cache.get(cache_key)
 
-    # Popular destination
-    if destination in POPULAR_DESTINATIONS:
-        price *= 1.15
+    if final_price is None:
+        with timer("pricing"):
+            final_price = round(rules.flight_price(destination, ticket_type, month, flight_time), 2)
+        quote_cache.put(cache_key, final_price)
 
-    final_price = round(price, 2)
-
-    price_collection.insert_one({
+    price_log.put({
         "destination": destination,
         "ticketType": ticket_type,
         "flightDate": flight_date_str,
@@ -61,6 +79,81 @@ def get_price():
 
     return jsonify({"final_price": final_price})
 
+# Prices many flights in one request. Each factor is applied as a column of
+# multipliers (1.0 where the factor does not apply), in the same order as
+# /get-price, so both routes return identical prices.
+@app.route("/get-price-batch", methods=["POST"])
+def get_price_batch():
+    data = request.json
+    items = data.get("items") if isinstance(data, dict) else data
+
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a list of items"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch size exceeds {MAX_BATCH_SIZE} items"}), 400
+
+    results = [None] * len(items)
+    valid = []  # (index, destination, ticket_type, flight_date_str, flight_time, month)
+
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[idx] = {"index": idx, "error": "Invalid item"}
+            continue
+
+        flight_date_str = item.get("flightDate")
+        try:
+            month = parse_flight_month(flight_date_str)
+        except (TypeError, ValueError):
+            results[idx] = {"index": idx, "error": "Invalid date format"}
+            continue
+
+        valid.append((
+            idx,
+            str(item.get("destination", "")).lower(),
+            str(item.get("ticketType", "")).lower(),
+            flight_date_str,
+            str(item.get("flightTime", "")).lower(),
+            month
+        ))
+
+    if valid:
+        indexes, destinations, ticket_types, flight_dates, flight_times, months = zip(*valid)
+        rules = pricing_rules.get()
+
+        with timer("pricing_batch"):
+            ticket_mult = np.array([rules.ticket_type_multipliers.get(t, 1.0) for t in ticket_types])
+            peak_mult = np.where(np.isin(np.array(months), list(rules.peak_months)), rules.peak_month_multiplier, 1.0)
+            time_mult = np.array([rules.flight_time_multipliers.get(t, 1.0) for t in flight_times])
+            dest_mult = np.where(
+                np.isin(np.array(destinations), list(rules.popular_destinations)),
+                rules.popular_destination_multiplier,
+                1.0
+            )
+
+            prices = np.full(len(valid), float(rules.base_price))
+            prices *= ticket_mult
+            prices *= peak_mult
+            prices *= time_mult
+            prices *= dest_mult
+
+        timestamp = datetime.now().isoformat()
+        log_entries = []
+        for i, price in enumerate(prices.tolist()):
+            final_price = round(price, 2)
+            results[indexes[i]] = {"index": indexes[i], "final_price": final_price}
+            log_entries.append({
+                "destination": destinations[i],
+                "ticketType": ticket_types[i],
+                "flightDate": flight_dates[i],
+                "flightTime": flight_times[i],
+                "final_price": final_price,
+                "timestamp": timestamp
+            })
+
+        price_log.put_many(log_entries)
+
+    return jsonify({"results": results})
+
 @app.route("/package-price", methods=["POST"])
 def package_price():
     package_data = request.json
@@ -89,57 +182,29 @@ def package_price():
     price = base_price
     pricing_factors = {}
 
+    rules = pricing_rules.get()
+
     # Factor 1: Demand-based pricing
     conversion_rate = bookings / visitors if visitors > 0 else 0
-    demand_multiplier = 1.0
-
-    if conversion_rate > 0.08:
-        demand_multiplier = 1.25
-    elif conversion_rate > 0.05:
-        demand_multiplier = 1.15
-    elif conversion_rate > 0.03:
-        demand_multiplier = 1.08
-    elif conversion_rate < 0.01 and visitors > 100:
-        demand_multiplier = 0.92
+    demand_multiplier = rules.demand_multiplier(conversion_rate, visitors)
 
     price *= demand_multiplier
     pricing_factors["demand_multiplier"] = demand_multiplier
 
     # Factor 2: Destination popularity
-    tier1_destinations = ["mumbai", "delhi", "bangalore", "goa", "jaipur", "agra"]
-    tier2_destinations = ["hyderabad", "chennai", "kolkata", "pune", "manali", "shimla"]
-
-    destination_multiplier = 1.0
-    if destination in tier1_destinations:
-        destination_multiplier = 1.15
-    elif destination in tier2_destinations:
-        destination_multiplier = 1.08
+    destination_multiplier = rules.destination_multiplier(destination)
 
     price *= destination_multiplier
     pricing_factors["destination_multiplier"] = destination_multiplier
 
     # Factor 3: Duration
-    duration_multiplier = 1.0
-    if duration_days >= 7:
-        duration_multiplier = 0.95
-    elif duration_days <= 1:
-        duration_multiplier = 1.12
+    duration_multiplier = rules.duration_multiplier(duration_days)
 
     price *= duration_multiplier
     pricing_factors["duration_multiplier"] = duration_multiplier
 
-    # Factor 4: Tags (only 4 supported)
-    valid_tags = ["hill station", "relaxation", "adventure", "beach"]
-    tag_multiplier = 1.0
-
-    if any(tag.lower() == "adventure" for tag in tags):
-        tag_multiplier = 1.12
-    elif any(tag.lower() == "relaxation" for tag in tags):
-        tag_multiplier = 1.08
-    elif any(tag.lower() == "hill station" for tag in tags):
-        tag_multiplier = 1.10
-    elif any(tag.lower() == "beach" for tag in tags):
-        tag_multiplier = 1.10
+    # Factor 4: Tags (highest-priority configured tag wins)
+    tag_multiplier = rules.tag_multiplier(tags)
 
     price *= tag_multiplier
     pricing_factors["tag_multiplier"] = tag_multiplier
@@ -162,7 +227,7 @@ def package_price():
         "timestamp": datetime.now().isoformat()
     }
 
-    price_collection.insert_one(log_entry)
+    price_log.put(log_entry)
 
     return jsonify({
         "original_price": base_price,
@@ -184,7 +249,7 @@ def get_season(month):
         return "winter"
 
 @app.route("/package-price-updated", methods=["POST"])
-def package_price():
+def package_price_updated():
     data = request.json
 
     base_price = data.get("price", 0)
@@ -221,7 +286,7 @@ def package_price():
         "timestamp": datetime.now().isoformat()
     }
 
-    price_collection.insert_one(log_entry)
+    price_log.put(log_entry)
 
     return jsonify({
         "original_price": base_price,
@@ -230,5 +295,19 @@ def package_price():
         "multiplier_used": selected_multiplier
     })
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "price_log": price_log.stats(),
+        "quote_cache": quote_cache.stats(),
+        "mongo_pool": mongo.pool_stats()
+    })
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Readiness: Mongo reachable within the timeouts, plus pool utilization
+    body, status = mongo.health()
+    return jsonify(body), status
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5005, debug=True)
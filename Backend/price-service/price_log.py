@@ -0,0 +1,186 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+OVERFLOW_POLICIES = ("block", "drop-oldest", "spill")
+
+
+class PriceLogWriter:
+    """Buffers price log entries in memory and writes them to Mongo in batches.
+
+    Routes call put()/put_many() and return immediately; a background thread
+    flushes the queue with insert_many once `batch_size` entries are waiting
+    or `flush_interval` seconds have passed. When the queue is full the
+    overflow policy decides what happens to new entries:
+
+    - "block": the caller waits until the writer frees up space
+    - "drop-oldest": the oldest queued entry is discarded
+    - "spill": the entry is appended to a local JSON-lines file
+    """
+
+    def __init__(self, collection, max_queue=10000, batch_size=500,
+                 flush_interval=0.5, overflow="block", spill_path="price_logs.spill.jsonl"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._closed_pid = None  # closed on purpose in this process; don't restart
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls, collection):
+        return cls(
+            collection,
+            max_queue=int(os.getenv("PRICE_LOG_MAX_QUEUE", 10000)),
+            batch_size=int(os.getenv("PRICE_LOG_BATCH_SIZE", 500)),
+            flush_interval=float(os.getenv("PRICE_LOG_FLUSH_INTERVAL", 0.5)),
+            overflow=os.getenv("PRICE_LOG_OVERFLOW", "block"),
+            spill_path=os.getenv("PRICE_LOG_SPILL_PATH", "price_logs.spill.jsonl"),
+        )
+
+    def put(self, entry):
+        self.put_many([entry])
+
+    def put_many(self, entries):
+        self._ensure_started()
+        to_spill = []
+        late = []  # arrived after close(); never queued
+
+        with self._cond:
+            for entry in entries:
+                if self._closed:
+                    late.append(entry)
+                    continue
+                if len(self._queue) >= self.max_queue:
+                    if self.overflow == "block":
+                        while len(self._queue) >= self.max_queue and not self._closed:
+                            self._cond.wait()
+                        if self._closed:
+                            late.append(entry)
+                            continue
+                    elif self.overflow == "drop-oldest":
+                        self._queue.popleft()
+                        self.dropped += 1
+                    else:
+                        to_spill.append(entry)
+                        continue
+
+                self._queue.append(entry)
+                self.enqueued += 1
+
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+            if late and self.overflow != "spill":
+                self.dropped += len(late)
+
+        if late and self.overflow == "spill":
+            to_spill.extend(late)
+        if to_spill:
+            self._spill(to_spill)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "overflow": self.overflow,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "failed": self.failed,
+            }
+
+    def close(self, timeout=10):
+        """Flushes everything still queued; later entries are spilled or dropped, not queued."""
+        with self._cond:
+            self._closed = True
+            self._closed_pid = os.getpid()
+            self._cond.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        # The thread is started lazily (and again after a fork) so that each
+        # worker process gets its own writer.
+        if self._closed_pid == os.getpid() or (self._pid == os.getpid() and self._thread.is_alive()):
+            return
+        with self._cond:
+            if self._closed_pid == os.getpid() or (self._pid == os.getpid() and self._thread.is_alive()):
+                return
+            self._pid = os.getpid()
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name="price-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                count = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(count)]
+                finished = self._closed and not self._queue
+                # Wake producers blocked on a full queue
+                self._cond.notify_all()
+
+            if batch:
+                self._write(batch)
+            if finished:
+                return
+
+    def _write(self, batch):
+        try:
+            self.collection.insert_many(batch, ordered=False)
+        except Exception as e:
+            print(f"Failed to write {len(batch)} price log entries: {e}")
+            with self._cond:
+                self.failed += len(batch)
+            if self.overflow == "spill":
+                self._spill(batch)
+            return
+
+        with self._cond:
+            self.written += len(batch)
+            self.batches += 1
+
+    def _spill(self, entries):
+        with self._spill_lock:
+            with open(self.spill_path, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, default=str) + "\n")
+        with self._cond:
+            self.spilled += len(entries)
+
+
+def create_price_log_writer(collection):
+    writer = PriceLogWriter.from_env(collection)
+    atexit.register(writer.close)
+    return writer
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+class CompiledRules:
+    """Pricing rules for /get-price and /package-price, compiled once from the config file.
+
+    Every factor is a constant-time lookup: destinations and tags are hashed,
+    demand tiers and duration ranges are bisect tables, so adding more
+    destinations, tags or breakpoints doesn't slow down a request.
+    """
+
+    def __init__(self, config, version=0):
+        self.version = version
+
+        # Flights: base fare scaled by ticket type, month, time and destination
+        flight = config.get("flight", {})
+        self.base_price = flight.get("base_price", 1000)
+        self.ticket_type_multipliers = {k.lower(): v for k, v in flight.get("ticket_types", {}).items()}
+        self.peak_months = frozenset(flight.get("peak_months", []))
+        self.peak_month_multiplier = flight.get("peak_month_multiplier", 1.0)
+        self.flight_time_multipliers = {k.lower(): v for k, v in flight.get("flight_times", {}).items()}
+        self.popular_destinations = frozenset(d.lower() for d in flight.get("popular_destinations", []))
+        self.popular_destination_multiplier = flight.get("popular_destination_multiplier", 1.0)
+
+        # Demand: conversion rate strictly above a threshold selects its tier
+        demand = config.get("demand", {})
+        tiers = sorted(demand.get("tiers", []), key=lambda t: t["above_conversion_rate"])
+        self.demand_thresholds = [t["above_conversion_rate"] for t in tiers]
+        self.demand_multipliers = [1.0] + [t["multiplier"] for t in tiers]
+        low = demand.get("low_conversion")
+        self.low_conversion = (
+            (low["below_conversion_rate"], low["above_visitors"], low["multiplier"]) if low else None
+        )
+
+        # Destinations: earlier tiers win when a name appears in several
+        self.destination_multipliers = {}
+        for tier in config.get("destinations", {}).get("tiers", []):
+            for name in tier["names"]:
+                self.destination_multipliers.setdefault(name.lower(), tier["multiplier"])
+
+        # Duration: inclusive upper bounds in days
+        duration = config.get("duration", {})
+        ranges = sorted(duration.get("ranges", []), key=lambda r: r["max_days"])
+        self.duration_bounds = [r["max_days"] for r in ranges]
+        self.duration_multipliers = [r["multiplier"] for r in ranges] + [duration.get("longer_multiplier", 1.0)]
+
+        # Tags: list order is priority order, the highest-priority tag present wins
+        self.tag_priorities = {}
+        for priority, rule in enumerate(config.get("tags", [])):
+            self.tag_priorities.setdefault(rule["tag"].lower(), (priority, rule["multiplier"]))
+
+    def flight_price(self, destination, ticket_type, month, flight_time):
+        price = self.base_price
+
+        if ticket_type in self.ticket_type_multipliers:
+            price *= self.ticket_type_multipliers[ticket_type]
+        if month in self.peak_months:
+            price *= self.peak_month_multiplier
+        if flight_time in self.flight_time_multipliers:
+            price *= self.flight_time_multipliers[flight_time]
+        if destination in self.popular_destinations:
+            price *= self.popular_destination_multiplier
+
+        return price
+
+    def demand_multiplier(self, conversion_rate, visitors):
+        tier = bisect_left(self.demand_thresholds, conversion_rate)
+        if tier:
+            return self.demand_multipliers[tier]
+        if self.low_conversion:
+            below_rate, above_visitors, multiplier = self.low_conversion
+            if conversion_rate < below_rate and visitors > above_visitors:
+                return multiplier
+        return 1.0
+
+    def destination_multiplier(self, destination):
+        return self.destination_multipliers.get(destination, 1.0)
+
+    def duration_multiplier(self, duration_days):
+        return self.duration_multipliers[bisect_left(self.duration_bounds, duration_days)]
+
+    def tag_multiplier(self, tags):
+        best = None
+        for tag in tags:
+            match = self.tag_priorities.get(str(tag).lower())
+            if match and (best is None or match[0] < best[0]):
+                best = match
+        return best[1] if best else 1.0
+
+
+class RuleStore:
+    """Holds the current CompiledRules and reloads them when the file changes.
+
+    The file's mtime is checked at most once every `check_interval` seconds.
+    If a reload fails the previous rules stay in effect.
+    """
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._rules = None
+        self._reload()
+
+    @classmethod
+    def from_env(cls):
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing_rules.json")
+        return cls(
+            os.getenv("PRICING_RULES_PATH", default_path),
+            check_interval=float(os.getenv("PRICING_RULES_RELOAD_INTERVAL", 2.0)),
+        )
+
+    @property
+    def version(self):
+        return self.get().version
+
+    def get(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._reload_if_changed()
+        return self._rules
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            print(f"Could not stat pricing rules {self.path}: {e}")
+            return
+        if mtime != self._mtime:
+            self._reload()
+
+    def _reload(self):
+        mtime = None
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path) as f:
+                config = json.load(f)
+            version = self._rules.version + 1 if self._rules else 1
+            rules = CompiledRules(config, version)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if self._rules is None:
+                raise
+            print(f"Keeping previous pricing rules, reload failed: {e}")
+            # Don't retry until the file changes again
+            self._mtime = mtime
+            return
+        self._mtime = mtime
+        self._rules = rules
+        print(f"Loaded pricing rules v{rules.version} from {self.path}")
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class QuoteCache:
+    """Bounded LRU cache of computed prices with a per-entry TTL.
+
+    Entries are tagged with the pricing rules version they were computed
+    under; when sync_version() sees a new version the whole cache is dropped.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            maxsize=int(os.getenv("QUOTE_CACHE_SIZE", 1024)),
+            ttl=float(os.getenv("QUOTE_CACHE_TTL", 300)),
+        )
+
+    def sync_version(self, version):
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "rules_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,157 @@
+from flask import Flask, request, jsonify
+import math
+import os
+import random
+import threading
+import time
+import uuid
+
+# Local stand-in for Gmail, Twilio and Pusher so the notification services
+# can be load-tested offline. Every endpoint sleeps for a lognormal latency,
+# answers 429 when its token bucket is empty and fails a fraction of calls
+# with a 500. Settings come from env vars: STUB_<PROVIDER>_<NAME> overrides
+# STUB_<NAME>, e.g. STUB_TWILIO_RATE_LIMIT=1 with STUB_LATENCY_MS=80.
+# Buckets and counters are per process, so run it as a single worker
+# (docker-compose.yml pins GUNICORN_WORKERS=1).
+
+app = Flask(__name__)
+
+PROVIDERS = ("gmail", "twilio", "pusher")
+
+
+def setting(provider, name, default):
+    value = os.getenv(f"STUB_{provider.upper()}_{name}", os.getenv(f"STUB_{name}"))
+    return float(value) if value is not None else default
+
+
+class ProviderProfile:
+    def __init__(self, provider):
+        self.provider = provider
+        self.latency_ms = setting(provider, "LATENCY_MS", 100.0)      # median
+        self.latency_sigma = setting(provider, "LATENCY_SIGMA", 0.5)  # lognormal shape, p99 ~ median * e^(2.33 sigma)
+        self.failure_rate = setting(provider, "FAILURE_RATE", 0.0)
+        self.rate_limit = setting(provider, "RATE_LIMIT", 0.0)        # requests/sec per key, 0 = unlimited
+        self.burst = setting(provider, "RATE_BURST", max(1.0, self.rate_limit))
+
+        self.lock = threading.Lock()
+        self.buckets = {}  # key -> (tokens, last refill)
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "failed": 0}
+
+    def take_token(self, key):
+        """Returns 0 if the call may proceed, otherwise seconds until a token is available."""
+        if self.rate_limit <= 0:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate_limit)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                return 0
+            self.buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate_limit
+
+    def count(self, outcome):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[outcome] += 1
+
+    def simulate(self, key):
+        """Applies latency, rate limiting and failures; returns an error response or None."""
+        retry_after = self.take_token(key)
+        if retry_after:
+            self.count("rate_limited")
+            response = jsonify({"error": "Too Many Requests", "code": 20429})
+            response.headers["Retry-After"] = f"{retry_after:.3f}"
+            return response, 429
+
+        median = self.latency_ms / 1000
+        time.sleep(median * math.exp(random.gauss(0, self.latency_sigma)) if median > 0 else 0)
+
+        if random.random() < self.failure_rate:
+            self.count("failed")
+            return jsonify({"error": "Simulated provider failure"}), 500
+
+        self.count("ok")
+        return None
+
+
+profiles = {provider: ProviderProfile(provider) for provider in PROVIDERS}
+
+
+# Gmail: users.messages.send and a JSON stand-in for the multipart batch endpoint
+@app.route("/gmail/send", methods=["POST"])
+def gmail_send():
+    error = profiles["gmail"].simulate("me")
+    if error:
+        return error
+    return jsonify({"id": uuid.uuid4().hex[:16], "labelIds": ["SENT"]})
+
+
+@app.route("/gmail/batch", methods=["POST"])
+def gmail_batch():
+    messages = (request.json or {}).get("messages", [])
+    error = profiles["gmail"].simulate("me")
+    if error:
+        return error
+
+    failure_rate = profiles["gmail"].failure_rate
+    results = [
+        {"error": "Simulated provider failure", "status": 500} if random.random() < failure_rate
+        else {"id": uuid.uuid4().hex[:16]}
+        for _ in messages
+    ]
+    return jsonify({"results": results})
+
+
+# Twilio: rate limited per sender number, like Twilio's per-number throughput
+@app.route("/twilio/Messages.json", methods=["POST"])
+def twilio_messages():
+    sender = request.form.get("From", "")
+    error = profiles["twilio"].simulate(sender)
+    if error:
+        return error
+    return jsonify({
+        "sid": "SM" + uuid.uuid4().hex,
+        "to": request.form.get("To"),
+        "from": sender,
+        "status": "queued"
+    }), 201
+
+
+# Pusher: single and batch event triggers
+@app.route("/pusher/events", methods=["POST"])
+def pusher_events():
+    error = profiles["pusher"].simulate("app")
+    if error:
+        return error
+    return jsonify({})
+
+
+# Pusher rejects batches with more than 10 events
+PUSHER_MAX_BATCH_EVENTS = 10
+
+
+@app.route("/pusher/batch_events", methods=["POST"])
+def pusher_batch_events():
+    events = (request.json or {}).get("batch", [])
+    if len(events) > PUSHER_MAX_BATCH_EVENTS:
+        return jsonify({"error": f"Batch too large, max {PUSHER_MAX_BATCH_EVENTS} events"}), 400
+
+    error = profiles["pusher"].simulate("app")
+    if error:
+        return error
+    return jsonify({})
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    result = {}
+    for provider, profile in profiles.items():
+        with profile.lock:
+            result[provider] = dict(profile.counts)
+    return jsonify(result)
+
+
+if __name__ == "__main__":
+    app.run(host='0.0.0.0', port=5099, threaded=True)
@@ -1,39 +1,107 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import pusher
-import os
+from common.metrics import instrument
+from common.providers import ProviderError
 from dotenv import load_dotenv
+from transport import create_transport
+from coalescer import create_coalescer
+import os
 
 load_dotenv()
 
 app = Flask(__name__)
 
-# CORS configuration (allows preflight and credentials)
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": [
+ALLOWED_ORIGINS = [
     "http://localhost:3000"
-]}})
+]
+
+# CORS configuration (allows preflight and credentials)
+CORS(app, supports_credentials=True, resources={r"/*": {"origins": ALLOWED_ORIGINS}})
+
+# Request counts, latencies and sub-step timings at GET /metrics (see common/metrics.py)
+instrument(app, "push")
+
 
+# Pusher, the provider stub or the built-in SSE hub (see transport.py)
+transport = create_transport(ALLOWED_ORIGINS)
 
-# Pusher setup
-pusher_client = pusher.Pusher(
-    app_id=os.getenv("PUSHER_APP_ID"),
-    key=os.getenv("PUSHER_KEY"),
-    secret=os.getenv("PUSHER_SECRET"),
-    cluster=os.getenv("PUSHER_CLUSTER"),
-    ssl=True
-)
+DEFAULT_CHANNEL = "booking-channel"
+DEFAULT_EVENT = "booking-confirmed"
+# Pusher allows up to 100 channels per trigger
+MAX_CHANNELS = 100
+MAX_EVENTS_PER_REQUEST = 100
+
+# PUSH_DELIVERY_MODE=coalesce queues events and sends them with
+# trigger_batch after a few milliseconds; sync triggers inline
+COALESCE_ENABLED = os.getenv("PUSH_DELIVERY_MODE", "sync").lower() == "coalesce"
+coalescer = create_coalescer(transport)
+
+def parse_events(data):
+    """Accepts a single event ({channels, event, data} or just {message}) or a list under "events"."""
+    items = data.get("events") if "events" in data else [data]
+    if not isinstance(items, list) or not items or len(items) > MAX_EVENTS_PER_REQUEST:
+        raise ValueError(f"'events' must be a list of 1 to {MAX_EVENTS_PER_REQUEST} events")
+
+    events = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Each event must be an object")
+        channels = item.get("channels", item.get("channel", DEFAULT_CHANNEL))
+        if isinstance(channels, str):
+            channels = [channels]
+        if not channels or len(channels) > MAX_CHANNELS:
+            raise ValueError(f"Each event needs 1 to {MAX_CHANNELS} channels")
+        name = item.get("event", DEFAULT_EVENT)
+        payload = item.get("data", {"message": item.get("message", "No message")})
+        events.append((channels, name, payload))
+    return events
 
 @app.route("/send-push", methods=["POST", "OPTIONS"])
 def send_push():
     if request.method == "OPTIONS":
         return jsonify({"status": "CORS preflight"}), 200
 
-    data = request.json
-    message = data.get("message", "No message")
+    data = request.json or {}
+    try:
+        events = parse_events(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if COALESCE_ENABLED:
+        # trigger_batch events target a single channel each
+        batch = [
+            {"channel": channel, "name": name, "data": payload}
+            for channels, name, payload in events
+            for channel in channels
+        ]
+        if not coalescer.submit(batch):
+            return jsonify({"error": "Push queue is full"}), 503
+        return jsonify({"status": "Push notification queued", "queued": len(batch)}), 202
 
     # Trigger push notification
-    pusher_client.trigger("booking-channel", "booking-confirmed", {"message": message})
+    try:
+        for channels, name, payload in events:
+            transport.trigger(channels, name, payload)
+    except ProviderError as e:
+        # 503 when the SSE hub isn't running here; any other provider failure is a 502
+        return jsonify({"error": str(e)}), 503 if e.status == 503 else 502
     return jsonify({"status": "Push notification sent"}), 200
 
+@app.route("/push-stats", methods=["GET"])
+def push_stats():
+    return jsonify({
+        "mode": "coalesce" if COALESCE_ENABLED else "sync",
+        "transport": transport.name,
+        "coalescer": coalescer.stats(),
+    })
+
+def warm_up():
+    # Opens the SSE port before the first event, so browsers can subscribe early
+    if hasattr(transport, "start"):
+        transport.start()
+
 if __name__ == "__main__":
+    # With the reloader, only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_up()
     app.run(host='0.0.0.0', port=5004, debug=True)
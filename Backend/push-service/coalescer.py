@@ -0,0 +1,161 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# Pusher accepts at most 10 events per trigger_batch call
+PUSHER_MAX_BATCH_EVENTS = 10
+
+
+class PushCoalescer:
+    """Buffers push events and sends them upstream with trigger_batch.
+
+    A flusher thread waits up to `linger_ms` after the first queued event
+    for more to arrive, then sends up to `max_batch` events in one call.
+    Several flushers run so one slow upstream call doesn't hold up the rest.
+    """
+
+    def __init__(self, transport, linger_ms=5, max_batch=PUSHER_MAX_BATCH_EVENTS, max_queue=10000, flushers=4):
+        self.transport = transport
+        self.linger = linger_ms / 1000
+        self.max_batch = min(max_batch, PUSHER_MAX_BATCH_EVENTS)
+        self.max_queue = max_queue
+        self.flushers = flushers
+
+        self._queue = deque()  # (enqueued_at, event)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.sent = 0
+        self.failed = 0
+        self.flush_sizes = Counter()
+        self.latencies = deque(maxlen=2048)  # seconds from enqueue to upstream ack
+
+    @classmethod
+    def from_env(cls, transport):
+        return cls(
+            transport,
+            linger_ms=float(os.getenv("PUSH_LINGER_MS", 5)),
+            max_batch=int(os.getenv("PUSH_MAX_BATCH", PUSHER_MAX_BATCH_EVENTS)),
+            max_queue=int(os.getenv("PUSH_MAX_QUEUE", 10000)),
+            flushers=int(os.getenv("PUSH_FLUSHERS", 4)),
+        )
+
+    def submit(self, events):
+        """Queues events ({"channel", "name", "data"}); returns False if the queue is full."""
+        self._ensure_started()
+        now = time.monotonic()
+        with self._cond:
+            if len(self._queue) + len(events) > self.max_queue:
+                self.rejected += len(events)
+                return False
+            self._queue.extend((now, event) for event in events)
+            self.enqueued += len(events)
+            self._cond.notify()
+        return True
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self.latencies)
+            flushes = self.flushes
+            return {
+                "queue_depth": len(self._queue),
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "sent": self.sent,
+                "failed": self.failed,
+                "flushes": flushes,
+                "avg_flush_size": round((self.sent + self.failed) / flushes, 2) if flushes else 0,
+                "flush_sizes": {str(size): count for size, count in sorted(self.flush_sizes.items())},
+                "latency_ms": {
+                    "p50": _percentile_ms(latencies, 50),
+                    "p99": _percentile_ms(latencies, 99),
+                    "max": _percentile_ms(latencies, 100),
+                },
+            }
+
+    def close(self, timeout=5):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._pid == os.getpid():
+            for thread in self._threads:
+                thread.join(timeout)
+
+    def _ensure_started(self):
+        # Started on first use (and again after a fork) so every worker
+        # process has its own flushers
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._closed = False
+            self._threads = [
+                threading.Thread(target=self._run, name=f"push-flusher-{i}", daemon=True)
+                for i in range(self.flushers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue and self._closed:
+                    return
+
+                # Linger so a burst can share one upstream call
+                deadline = self._queue[0][0] + self.linger
+                while len(self._queue) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                count = min(len(self._queue), self.max_batch)
+                batch = [self._queue.popleft() for _ in range(count)]
+                if self._queue:
+                    self._cond.notify()
+
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.transport.trigger_batch([event for _, event in batch])
+            ok = True
+        except Exception as e:
+            print(f"Push batch of {len(batch)} events failed: {e}")
+            ok = False
+
+        done = time.monotonic()
+        with self._cond:
+            self.flushes += 1
+            self.flush_sizes[len(batch)] += 1
+            if ok:
+                self.sent += len(batch)
+                self.latencies.extend(done - enqueued_at for enqueued_at, _ in batch)
+            else:
+                self.failed += len(batch)
+
+
+def _percentile_ms(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def create_coalescer(transport):
+    coalescer = PushCoalescer.from_env(transport)
+    atexit.register(coalescer.close)
+    return coalescer
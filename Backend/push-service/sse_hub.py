@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+class HubNotRunning(Exception):
+    """The hub isn't listening in this process, so the event can't reach anyone."""
+
+
+class Subscriber:
+    def __init__(self, channels, buffer_size):
+        self.channels = channels
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.task = None
+
+
+class SseHub:
+    """Server-Sent Events fan-out served from an asyncio loop in a background thread.
+
+    Browsers connect to GET /events?channels=a,b and receive every event
+    published to those channels. publish() is thread-safe, so Flask request
+    threads hand events to the loop without blocking. Each event is encoded
+    once and shared by all subscribers. Each subscriber has a bounded buffer;
+    a client that falls `buffer_size` events behind is disconnected so it
+    can't hold memory or slow everyone else down. Idle connections get a
+    comment line every `heartbeat` seconds to keep proxies from closing them.
+
+    Subscribers live in this process only, so push-service runs a single
+    worker process when SSE is enabled (create_transport() refuses more).
+    The server starts on the first start() or publish() in a process, which
+    keeps the Flask reloader's parent process from holding the port.
+    publish() raises HubNotRunning if it couldn't listen.
+    """
+
+    def __init__(self, host="0.0.0.0", port=5014, buffer_size=64, heartbeat=15.0, allowed_origins=()):
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.allowed_origins = set(allowed_origins)
+
+        self.loop = None
+        self._channels = {}  # channel -> set of Subscriber
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._next_id = 0
+
+        self.connected = 0
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.loop = None
+            self._started.clear()
+            thread = threading.Thread(target=self._run, name="sse-hub", daemon=True)
+            thread.start()
+        self._started.wait(10)
+
+    def publish(self, channel, event, data):
+        self.start()
+        if self.loop is None:
+            raise HubNotRunning(f"SSE hub is not listening on port {self.port} in this process")
+        self.loop.call_soon_threadsafe(self._fanout, channel, event, data)
+
+    def stats(self):
+        # list() copies the dict in one step, the loop thread may be mutating it
+        channels = Counter({channel: len(subs) for channel, subs in list(self._channels.items())})
+        return {
+            "subscribers": self.connected,
+            "channels": dict(channels),
+            "published": self.published,
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+        }
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        app = web.Application()
+        app.router.add_get("/events", self._handle_events)
+        app.router.add_get("/sse-stats", self._handle_stats)
+        runner = web.AppRunner(app, access_log=None)
+
+        try:
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, self.host, self.port, backlog=1024).start())
+        except OSError as e:
+            print(f"SSE hub could not listen on {self.host}:{self.port}: {e}")
+            self._started.set()
+            return
+
+        print(f"SSE hub listening on {self.host}:{self.port}")
+        self.loop = loop
+        self._started.set()
+        loop.run_forever()
+
+    def _fanout(self, channel, event, data):
+        self._next_id += 1
+        self.published += 1
+        message = (
+            f"id: {self._next_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        ).encode()
+
+        for subscriber in list(self._channels.get(channel, ())):
+            try:
+                subscriber.queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._evict(subscriber)
+
+    def _evict(self, subscriber):
+        self.evicted += 1
+        self._unsubscribe(subscriber)
+        if subscriber.task is not None:
+            subscriber.task.cancel()
+
+    def _subscribe(self, subscriber):
+        self.connected += 1
+        for channel in subscriber.channels:
+            self._channels.setdefault(channel, set()).add(subscriber)
+
+    def _unsubscribe(self, subscriber):
+        removed = False
+        for channel in subscriber.channels:
+            subs = self._channels.get(channel)
+            if subs and subscriber in subs:
+                subs.discard(subscriber)
+                removed = True
+                if not subs:
+                    del self._channels[channel]
+        if removed:
+            self.connected -= 1
+
+    async def _handle_events(self, request):
+        channels = [c for c in request.query.get("channels", "").split(",") if c]
+        if not channels:
+            return web.json_response({"error": "channels query parameter is required"}, status=400)
+
+        headers = {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+        origin = request.headers.get("Origin")
+        if origin and origin in self.allowed_origins:
+            headers["Access-Control-Allow-Origin"] = origin
+            headers["Access-Control-Allow-Credentials"] = "true"
+
+        response = web.StreamResponse(headers=headers)
+        await response.prepare(request)
+
+        subscriber = Subscriber(channels, self.buffer_size)
+        subscriber.task = asyncio.current_task()
+        self._subscribe(subscriber)
+        try:
+            await response.write(b"retry: 3000\n\n")
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    message = f": heartbeat {int(time.time())}\n\n".encode()
+                await response.write(message)
+        except (asyncio.CancelledError, ConnectionResetError):
+            pass
+        finally:
+            self._unsubscribe(subscriber)
+        return response
+
+    async def _handle_stats(self, request):
+        return web.json_response(self.stats())
@@ -0,0 +1,160 @@
+import os
+
+import pusher
+from pusher.errors import PusherError
+import requests
+
+from common.metrics import timed
+from common.providers import ProviderError
+from common.serve import worker_count
+from sse_hub import HubNotRunning, SseHub
+
+# PUSH_TRANSPORT picks where events go:
+#   pusher - the Pusher Channels API (default)
+#   stub   - the local provider stub (Backend/provider-stub) at STUB_PROVIDER_URL,
+#            for load tests without a Pusher account
+#   sse    - the built-in Server-Sent Events hub (sse_hub.py) on PUSH_SSE_PORT
+# Several can be combined, e.g. PUSH_TRANSPORT=pusher,sse while migrating.
+
+
+class PusherTransport:
+    name = "pusher"
+
+    def __init__(self):
+        self.client = pusher.Pusher(
+            app_id=os.getenv("PUSHER_APP_ID"),
+            key=os.getenv("PUSHER_KEY"),
+            secret=os.getenv("PUSHER_SECRET"),
+            cluster=os.getenv("PUSHER_CLUSTER"),
+            ssl=True
+        )
+
+    @timed("pusher_trigger")
+    def trigger(self, channels, event_name, data):
+        try:
+            return self.client.trigger(channels, event_name, data)
+        except PusherError as e:
+            raise ProviderError(str(e)) from e
+
+    @timed("pusher_trigger_batch")
+    def trigger_batch(self, events):
+        try:
+            return self.client.trigger_batch(events)
+        except PusherError as e:
+            raise ProviderError(str(e)) from e
+
+
+class StubPushTransport:
+    name = "stub"
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @timed("stub_trigger")
+    def trigger(self, channels, event_name, data):
+        if isinstance(channels, str):
+            channels = [channels]
+        return self._post("/pusher/events", {"channels": channels, "name": event_name, "data": data})
+
+    @timed("stub_trigger_batch")
+    def trigger_batch(self, events):
+        return self._post("/pusher/batch_events", {"batch": events})
+
+    def _post(self, path, payload):
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise ProviderError(
+                f"Provider returned {response.status_code}: {response.text}",
+                response.status_code,
+                response.headers.get("Retry-After")
+            )
+        return response.json()
+
+
+class SseTransport:
+    name = "sse"
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        self.hub.start()
+
+    def trigger(self, channels, event_name, data):
+        if isinstance(channels, str):
+            channels = [channels]
+        try:
+            for channel in channels:
+                self.hub.publish(channel, event_name, data)
+        except HubNotRunning as e:
+            raise ProviderError(str(e), 503) from e
+        return {}
+
+    def trigger_batch(self, events):
+        try:
+            for event in events:
+                self.hub.publish(event["channel"], event["name"], event["data"])
+        except HubNotRunning as e:
+            raise ProviderError(str(e), 503) from e
+        return {}
+
+
+class FanoutTransport:
+    """Sends every event through each of several transports in turn.
+
+    A failing transport doesn't stop the others; the first error is raised
+    once all of them have been tried.
+    """
+
+    def __init__(self, transports):
+        self.transports = transports
+        self.name = ",".join(t.name for t in transports)
+
+    def start(self):
+        for transport in self.transports:
+            if hasattr(transport, "start"):
+                transport.start()
+
+    def trigger(self, channels, event_name, data):
+        return self._each(lambda transport: transport.trigger(channels, event_name, data))
+
+    def trigger_batch(self, events):
+        return self._each(lambda transport: transport.trigger_batch(events))
+
+    def _each(self, call):
+        error = None
+        for transport in self.transports:
+            try:
+                call(transport)
+            except Exception as e:
+                print(f"Push via {transport.name} failed: {e}")
+                error = error or e
+        if error is not None:
+            raise error
+        return {}
+
+
+def create_transport(allowed_origins=()):
+    kinds = [k.strip() for k in os.getenv("PUSH_TRANSPORT", "pusher").lower().split(",") if k.strip()]
+    transports = [_create_one(kind, allowed_origins) for kind in kinds]
+    return transports[0] if len(transports) == 1 else FanoutTransport(transports)
+
+
+def _create_one(kind, allowed_origins):
+    if kind == "pusher":
+        return PusherTransport()
+    if kind == "stub":
+        return StubPushTransport(os.getenv("STUB_PROVIDER_URL", "http://localhost:5099"))
+    if kind == "sse":
+        # Only one process can bind PUSH_SSE_PORT; the others would drop every event
+        if worker_count() > 1:
+            raise ValueError("PUSH_TRANSPORT=sse needs a single worker process, set GUNICORN_WORKERS=1")
+        return SseTransport(SseHub(
+            port=int(os.getenv("PUSH_SSE_PORT", 5014)),
+            buffer_size=int(os.getenv("PUSH_SSE_BUFFER", 64)),
+            heartbeat=float(os.getenv("PUSH_SSE_HEARTBEAT", 15)),
+            allowed_origins=allowed_origins,
+        ))
+    raise ValueError(f"Unknown PUSH_TRANSPORT {kind!r}, expected 'pusher', 'stub' or 'sse'")
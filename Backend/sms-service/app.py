@@ -1,25 +1,73 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from common.idempotency import IdempotencyStore
+from common.metrics import instrument
+from common.mongo import MongoPool, mongo_unavailable
+from common.outbox import Outbox
+from common.providers import ProviderError
+from pymongo.errors import ConnectionFailure
 from dotenv import load_dotenv
 import os
-from twilio.rest import Client
-import pymongo
+from transport import create_transport
+from dispatcher import SmsDispatcher, RateLimited
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True, origins=["http://localhost:3000", "http://159.223.171.199:56300", "http://localhost:8501"])
 
-client = pymongo.MongoClient("mongodb://host.docker.internal:27017")
+# Request counts, latencies and sub-step timings at GET /metrics (see common/metrics.py)
+instrument(app, "sms")
+
+# MongoDB, pooled and with fail-fast timeouts (MONGO_* variables, see common/mongo.py)
+mongo = MongoPool.from_env()
+client = mongo.client
+app.register_error_handler(ConnectionFailure, mongo_unavailable)
 db = client["sms_db"]
 sms_col = db["sms_notification"]
 
-twilio_sid = os.getenv("TWILIO_ACCOUNT_SID")
-twilio_token = os.getenv("TWILIO_AUTH_TOKEN")
+# Repeated sends (same Idempotency-Key, or same body within the window)
+# get the first response back instead of another provider call
+dedupe = IdempotencyStore.from_env(db["idempotency_keys"])
+
 twilio_number = os.getenv("TWILIO_PHONE_NUMBER")
-twilio_client = Client(twilio_sid, twilio_token)
+# Optional comma-separated pool of extra sender numbers to spread load over
+sender_numbers = [twilio_number] + [
+    n.strip() for n in os.getenv("TWILIO_EXTRA_NUMBERS", "").split(",") if n.strip()
+]
+# Twilio (or the provider stub, see transport.py)
+transport = create_transport()
+# Paces sends to each sender number's rate limit
+dispatcher = SmsDispatcher.from_env(transport, sender_numbers)
+
+MAX_BULK_SMS = int(os.getenv("MAX_BULK_SMS", 1000))
+
+# /send-sms-bulk queues its messages in Mongo and returns 202; outbox
+# threads (SMS_OUTBOX_WORKERS, default SMS_CONCURRENCY) drain them at the
+# senders' rate limit however long that takes, and /sms-status/<id>
+# reports each message
+def deliver_queued_sms(doc):
+    # Waits for a slot inside the lease, so the doc isn't claimed twice meanwhile
+    return dispatcher.send(doc["to"], doc["body"], max_wait=sms_outbox.lease / 2)
+
+def finish_queued_sms(doc, sid, error):
+    if error is None:
+        sms_col.insert_one({"to": doc["to"], "message": doc["body"], "sid": sid, "type": "bulk"})
+
+def final_sms_error(error):
+    # Any provider answer but a 429 is final: after a 5xx the SMS may have gone out
+    return isinstance(error, ProviderError) and error.status != 429
+
+sms_outbox = Outbox.from_env("SMS_OUTBOX", db["sms_outbox"], deliver_queued_sms, finish_queued_sms,
+                             permanent=final_sms_error, workers=int(os.getenv("SMS_CONCURRENCY", 8)))
+sms_outbox.start()
+
+# Called by gunicorn in each worker after fork (see common/gunicorn_conf.py)
+def warm_up():
+    client.admin.command("ping")
 
 @app.route("/send-sms", methods=["POST"])
+@dedupe.idempotent
 def send_sms():
     data = request.json
     phone = data.get("phone")
@@ -28,23 +76,22 @@ def send_sms():
     msg = f"Your {ticket_type.lower()} ticket to {destination} has been booked!"
 
     try:
-        sms = twilio_client.messages.create(
-            body=msg,
-            from_=twilio_number,
-            to=phone
-        )
+        sid = dispatcher.send(phone, msg)
 
         sms_col.insert_one({
             "to": phone,
             "message": msg,
-            "sid": sms.sid
+            "sid": sid
         })
 
-        return jsonify({"message": "SMS sent!", "sid": sms.sid})
+        return jsonify({"message": "SMS sent!", "sid": sid})
+    except RateLimited as e:
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
 @app.route("/send-suds-sms", methods=["POST"])
+@dedupe.idempotent
 def send_suds_sms():
     data = request.json
     phone = data.get("phone")
@@ -66,24 +113,23 @@ def send_suds_sms():
     )
 
     try:
-        sms = twilio_client.messages.create(
-            body=msg,
-            from_=twilio_number,
-            to=phone
-        )
+        sid = dispatcher.send(phone, msg)
 
         sms_col.insert_one({
             "to": phone,
             "message": msg,
-            "sid": sms.sid,
+            "sid": sid,
             "type": "suds"
         })
 
-        return jsonify({"message": "SUDS SMS sent!", "sid": sms.sid})
+        return jsonify({"message": "SUDS SMS sent!", "sid": sid})
+    except RateLimited as e:
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
 @app.route("/send-quote-sms", methods=["POST"])
+@dedupe.idempotent
 def send_quote_sms():
     data = request.json
     phone_number = data.get("phone_number")
@@ -93,21 +139,66 @@ def send_quote_sms():
         return jsonify({"error": "Missing 'phone_number' or 'message' in request"}), 400
 
     try:
-        sms = twilio_client.messages.create(
-            body=message,
-            from_=twilio_number,
-            to=phone_number
-        )
+        sid = dispatcher.send(phone_number, message)
 
         sms_col.insert_one({
             "to": phone_number,
             "message": message,
-            "sid": sms.sid
+            "sid": sid
         })
 
-        return jsonify({"message": "Quote SMS sent!", "sid": sms.sid}), 200
+        return jsonify({"message": "Quote SMS sent!", "sid": sid}), 200
+    except RateLimited as e:
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+# Queues many messages in one call and returns 202 with an id per message.
+# The SMS outbox sends them at the sender numbers' rate limit, so a large
+# batch is spread out instead of rejected; poll /sms-status/<id> for SIDs
+# and errors. Sent messages are logged to sms_notification as they finish.
+@app.route("/send-sms-bulk", methods=["POST"])
+@dedupe.idempotent
+def send_sms_bulk():
+    data = request.json or {}
+    messages = data.get("messages")
+
+    if not isinstance(messages, list) or not messages:
+        return jsonify({"error": "Messages list missing"}), 400
+    if len(messages) > MAX_BULK_SMS:
+        return jsonify({"error": f"At most {MAX_BULK_SMS} messages per request"}), 400
+
+    results = [None] * len(messages)
+    valid = []  # (index, phone_number, message)
+
+    for idx, item in enumerate(messages):
+        if not isinstance(item, dict) or not item.get("phone_number") or not item.get("message"):
+            results[idx] = {"index": idx, "status": "failed", "error": "Missing 'phone_number' or 'message'"}
+            continue
+        valid.append((idx, item["phone_number"], item["message"]))
+
+    ids = sms_outbox.enqueue_many("bulk", [{"to": phone, "body": message} for _, phone, message in valid])
+    for (idx, phone, _), message_id in zip(valid, ids):
+        results[idx] = {"index": idx, "to": phone, "id": message_id, "status": "pending"}
+    return jsonify({"results": results, "queued": len(ids), "failed": len(messages) - len(ids)}), 202
+
+@app.route("/sms-status/<message_id>", methods=["GET"])
+def sms_status(message_id):
+    try:
+        status = sms_outbox.status(message_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if status is None:
+        return jsonify({"error": "Unknown message id"}), 404
+    # message_id is the Twilio SID once sent
+    return jsonify(status), 200
     
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Readiness: Mongo reachable within the timeouts, plus pool utilization
+    body, status = mongo.health()
+    return jsonify(body), status
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5003, debug=True)
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+from common.providers import ProviderError
+from common.serve import worker_count
+
+
+class RateLimited(Exception):
+    """No sender number can take the message within the allowed wait."""
+
+
+class TokenBucket:
+    """Reservation-based token bucket.
+
+    reserve() hands out the next free slot and returns how long the caller
+    must wait for it, so concurrent callers are spaced out instead of all
+    retrying at once. Tokens go negative while slots are reserved ahead.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait_time(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def reserve(self, max_wait):
+        """Reserves a slot and returns its wait, or None if it is further away than max_wait."""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def back_off(self, seconds):
+        """The provider said 429: don't hand out another slot for `seconds`."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class SmsDispatcher:
+    """Sends SMS through the transport at each sender number's rate limit.
+
+    Every sender number gets its own token bucket (Twilio limits throughput
+    per number); a message goes to whichever sender has the earliest free
+    slot. Messages that would wait longer than `max_wait` fail fast with
+    RateLimited. 429s are retried after backing off; 5xx are not, since the
+    provider may have created the message anyway. Bulk sends don't come
+    through here in one go: they are queued in the SMS outbox, whose
+    workers call send() one message at a time (see app.py).
+
+    The buckets live in the process, so from_env() splits
+    SMS_RATE_PER_SENDER between the gunicorn workers.
+    """
+
+    def __init__(self, transport, senders, rate_per_sender=1.0, burst=1, max_wait=30.0, max_retries=3):
+        self.transport = transport
+        self.senders = senders
+        self.buckets = {sender: TokenBucket(rate_per_sender, burst) for sender in senders}
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+
+    @classmethod
+    def from_env(cls, transport, senders):
+        return cls(
+            transport,
+            senders,
+            rate_per_sender=float(os.getenv("SMS_RATE_PER_SENDER", 1.0)) / worker_count(),
+            burst=float(os.getenv("SMS_RATE_BURST", 1)),
+            max_wait=float(os.getenv("SMS_MAX_QUEUE_WAIT", 30)),
+            max_retries=int(os.getenv("SMS_MAX_RETRIES", 3)),
+        )
+
+    def send(self, to, body, max_wait=None):
+        """Sends one message and returns its SID; max_wait overrides the default wait for a slot."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        sender, start_at = self._reserve(deadline, max_wait)
+        return self._send(to, body, sender, start_at, deadline, max_wait)
+
+    def _send(self, to, body, sender, start_at, deadline, max_wait):
+        for attempt in range(self.max_retries + 1):
+            delay = start_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            try:
+                return self.transport.send(to, body, sender)
+            except ProviderError as e:
+                # Only a 429 says the message was not created; retrying a 5xx could send it twice
+                if e.status != 429 or attempt == self.max_retries:
+                    raise
+                self.buckets[sender].back_off(_seconds(e.retry_after, 1 / self.buckets[sender].rate))
+                sender, start_at = self._reserve(deadline, max_wait)
+
+    def _reserve(self, deadline, max_wait):
+        """Picks the sender with the earliest slot; returns (sender, monotonic time to send at)."""
+        now = time.monotonic()
+        sender = min(self.senders, key=lambda s: self.buckets[s].wait_time())
+        wait = self.buckets[sender].reserve(deadline - now)
+        if wait is None:
+            raise RateLimited(f"SMS rate limit reached, no sender free within {max_wait:.0f}s")
+        return sender, now + wait
+
+
+def _seconds(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
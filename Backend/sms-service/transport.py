@@ -0,0 +1,70 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from common.metrics import timed
+from common.providers import ProviderError
+
+# SMS_TRANSPORT picks where messages go:
+#   twilio - the Twilio API (default)
+#   stub   - the local provider stub (Backend/provider-stub) at STUB_PROVIDER_URL,
+#            for load tests without a Twilio account
+#
+# Both keep one pooled keep-alive session per process; SMS_HTTP_POOL_SIZE
+# should cover the request threads plus the bulk dispatcher's workers.
+
+
+class TwilioTransport:
+    name = "twilio"
+
+    def __init__(self, account_sid, auth_token, pool_size=32):
+        http_client = TwilioHttpClient(pool_connections=True)
+        http_client.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+        self.client = Client(account_sid, auth_token, http_client=http_client)
+
+    @timed("twilio_send")
+    def send(self, to, body, from_):
+        try:
+            return self.client.messages.create(body=body, from_=from_, to=to).sid
+        except TwilioRestException as e:
+            raise ProviderError(str(e), e.status) from e
+
+
+class StubSmsTransport:
+    name = "stub"
+
+    def __init__(self, base_url, timeout=10, pool_size=32):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+
+    @timed("stub_send")
+    def send(self, to, body, from_):
+        response = self.session.post(
+            f"{self.base_url}/twilio/Messages.json",
+            data={"To": to, "From": from_, "Body": body},
+            timeout=self.timeout
+        )
+        if response.status_code >= 400:
+            raise ProviderError(
+                f"Provider returned {response.status_code}: {response.text}",
+                response.status_code,
+                response.headers.get("Retry-After")
+            )
+        return response.json()["sid"]
+
+
+def create_transport():
+    kind = os.getenv("SMS_TRANSPORT", "twilio").lower()
+    pool_size = int(os.getenv("SMS_HTTP_POOL_SIZE", 32))
+    if kind == "twilio":
+        return TwilioTransport(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"), pool_size)
+    if kind == "stub":
+        return StubSmsTransport(os.getenv("STUB_PROVIDER_URL", "http://localhost:5099"), pool_size=pool_size)
+    raise ValueError(f"Unknown SMS_TRANSPORT {kind!r}, expected 'twilio' or 'stub'")
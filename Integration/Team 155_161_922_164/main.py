@@ -1,17 +1,127 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
 from typing import List, Dict, Any
+import asyncio
+import copy
+import os
 import httpx
+from offer_cache import FeedCache, TtlLru
+from offer_store import OfferStore, compute_offers, fingerprint
 
 # Import services and core logic
 from services import user_activity_service, festival_trend_service, traffic_analyzer
-from core import rule_engine, offer_generator
 
-app = FastAPI(title="Personalized Travel Offer Microservice")
+EMAIL_SERVICE_URL = os.getenv("EMAIL_SERVICE_URL", "http://bore.pub:30002/send-offer-email")
+
+# Seconds each upstream source may take before the request gives up on it
+SOURCE_TIMEOUTS = {
+    "user_activity": float(os.getenv("OFFER_ACTIVITY_TIMEOUT", 1.0)),
+    "trends": float(os.getenv("OFFER_TRENDS_TIMEOUT", 2.0)),
+    "traffic": float(os.getenv("OFFER_TRAFFIC_TIMEOUT", 2.0)),
+}
+
+# One pooled client for all email sends, opened and closed with the app
+http_client: httpx.AsyncClient = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    )
+    # Keep the global feeds warm so requests don't wait on a refresh
+    refreshers = [asyncio.create_task(cache.run()) for cache in (trends_cache, traffic_cache)]
+    yield
+    for task in refreshers:
+        task.cancel()
+    offer_store.close()
+    await http_client.aclose()
+
+
+app = FastAPI(title="Personalized Travel Offer Microservice", lifespan=lifespan)
+
+
+class SourceTimeout(Exception):
+    def __init__(self, source):
+        super().__init__(f"{source} did not respond within {SOURCE_TIMEOUTS[source]}s")
+        self.source = source
+
+
+async def fetch(source, func, *args):
+    """Runs a blocking service call in a thread, bounded by the source's timeout."""
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), SOURCE_TIMEOUTS[source])
+    except asyncio.TimeoutError:
+        raise SourceTimeout(source)
+
+
+# Offers computed once per change of inputs, not per page view
+offer_store = OfferStore(
+    maxsize=int(os.getenv("OFFER_STORE_SIZE", 100000)),
+    workers=int(os.getenv("OFFER_BATCH_WORKERS", 0)) or None,
+    chunk_size=int(os.getenv("OFFER_BATCH_CHUNK", 500)),
+)
+
+
+def feed_versions():
+    return trends_cache.version, traffic_cache.version
+
+
+async def rebuild_offers():
+    # A feed changed: recompute every materialized user in the process pool
+    try:
+        await offer_store.rebuild_all(lambda: (trends_cache.value, traffic_cache.value, feed_versions()))
+    except Exception as e:
+        print(f"Rebuilding offers failed: {e}")
+
+
+# Trends and traffic are the same for every user: cached with stale-while-revalidate
+trends_cache = FeedCache(
+    "trends",
+    lambda: fetch("trends", festival_trend_service.get_festivals_and_trends),
+    ttl=float(os.getenv("OFFER_TRENDS_TTL", 300)),
+    stale_ttl=float(os.getenv("OFFER_FEED_STALE_TTL", 3600)),
+    on_change=rebuild_offers,
+)
+traffic_cache = FeedCache(
+    "traffic",
+    lambda: fetch("traffic", traffic_analyzer.get_trending_destinations),
+    ttl=float(os.getenv("OFFER_TRAFFIC_TTL", 60)),
+    stale_ttl=float(os.getenv("OFFER_FEED_STALE_TTL", 3600)),
+    on_change=rebuild_offers,
+)
+# Per-user activity changes more often, so only a short TTL
+activity_cache = TtlLru(
+    maxsize=int(os.getenv("OFFER_ACTIVITY_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("OFFER_ACTIVITY_TTL", 30)),
+)
+
+
+async def get_user_activity(user_id):
+    """Returns (activity, fingerprint); the fingerprint is computed once per fetch."""
+    cached = activity_cache.get(user_id)
+    if cached is None:
+        user_data = await fetch("user_activity", user_activity_service.get_user_activity, user_id)
+        cached = (user_data, fingerprint(user_data))
+        activity_cache.put(user_id, cached)
+    # Callers may edit it (test_email), the cached copy stays untouched
+    return copy.deepcopy(cached[0]), cached[1]
+
+
+async def send_offer_email(payload):
+    # Runs after the response has gone out; failures are only logged
+    try:
+        response = await http_client.post(EMAIL_SERVICE_URL, json=payload)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Failed to send email: {e}")
 
-EMAIL_SERVICE_URL = "http://bore.pub:30002/send-offer-email"
 
 @app.get("/offers", response_model=List[Dict[str, Any]])
-def get_personalized_offers(
+async def get_personalized_offers(
+    background_tasks: BackgroundTasks,
     user_id: int = Query(..., description="The ID of the user to generate offers for"),
     test_email: str = Query(None, description="Optional test email to override user email")
 ):
@@ -20,39 +130,57 @@ def get_personalized_offers(
         raise HTTPException(status_code=400, detail="user_id parameter is required")
 
     try:
-        # 1. Fetch user activity and override email if testing
-        user_data = user_activity_service.get_user_activity(4)
+        # 1-2. Fetch user activity, trends and traffic data concurrently
+        (user_data, activity_fp), trends_data, traffic_data = await asyncio.gather(
+            get_user_activity(4),
+            trends_cache.get(),
+            traffic_cache.get(),
+        )
+
+        # 3. Look up the materialized offers; apply rules only if an input changed
+        # (values re-read with the versions so a refresh during the gather can't mix them)
+        versions = feed_versions()
+        trends_data, traffic_data = trends_cache.value, traffic_cache.value
+        offers = offer_store.lookup(user_id, activity_fp, versions)
+        if offers is None:
+            offers = compute_offers(user_data, trends_data, traffic_data)
+            offer_store.save(user_id, copy.deepcopy(user_data), activity_fp, versions, offers)
+
         if test_email:
             user_data["email"] = test_email
 
-        # 2. Fetch trends and traffic data
-        trends_data = festival_trend_service.get_festivals_and_trends()
-        traffic_data = traffic_analyzer.get_trending_destinations()
-
-        # 3. Apply rules and generate offers
-        potential_destinations = rule_engine.apply_rules(user_data, trends_data, traffic_data)
-        offers = offer_generator.generate_offers(potential_destinations)
-
-        # 4. Send the offers as an email
-        try:
-            email_payload = {
-                "user_id": user_id,
-                "email": user_data.get("email"),
-                "offers": offers
-            }
-            response = httpx.post(EMAIL_SERVICE_URL, json=email_payload, timeout=5.0)
-            response.raise_for_status()
-        except httpx.HTTPError as e:
-            print(f"Failed to send email: {e}")
-            # You can choose to still return offers even if email fails
+        # 4. Send the offers as an email without holding up the response
+        background_tasks.add_task(send_offer_email, {
+            "user_id": user_id,
+            "email": user_data.get("email"),
+            "offers": offers
+        })
 
         # 5. Return the offers
         return offers
 
+    except SourceTimeout as e:
+        print(f"Error generating offers for user {user_id}: {e}")
+        raise HTTPException(status_code=504, detail=f"Upstream {e.source} timed out")
     except Exception as e:
         print(f"Error generating offers for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error generating offers")
 
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "trends": trends_cache.stats(),
+        "traffic": traffic_cache.stats(),
+        "user_activity": activity_cache.stats(),
+        "offers": offer_store.stats(),
+    }
+
+@app.post("/offers/rebuild")
+async def rebuild_all_offers():
+    """Batch mode: recompute offers for every materialized user against the current feeds."""
+    await rebuild_offers()
+    return offer_store.stats()
+
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the Personalized Travel Offer Microservice! Visit /docs for API documentation."}
\ No newline at end of file
+    return {"message": "Welcome to the Personalized Travel Offer Microservice! Visit /docs for API documentation."}
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class FeedCache:
+    """Caches one global feed (trends, traffic) with TTL and stale-while-revalidate.
+
+    `load` is an async callable returning the fresh value. Within `ttl`
+    seconds the cached value is served as is; after that it is still served
+    (stale) for up to `stale_ttl` more seconds while a single background
+    refresh runs. Only a cold cache, or one older than ttl + stale_ttl,
+    makes a request wait. run() refreshes ahead of expiry so requests
+    normally never see a stale value either.
+
+    `version` goes up each time a refresh brings a different value, and
+    `on_change` (an async callable) is scheduled when it does.
+    """
+
+    def __init__(self, name, load, ttl=300, stale_ttl=3600, on_change=None):
+        self.name = name
+        self.load = load
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.on_change = on_change
+
+        self.value = None
+        self.version = 0
+        self.loaded_at = None
+        self._refreshing = None  # in-flight refresh task
+        self._last_error = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    async def get(self):
+        age = self.age()
+        if age is not None and age < self.ttl:
+            self.hits += 1
+            return self.value
+        if age is not None and age < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            self._refresh_in_background()
+            return self.value
+
+        self.misses += 1
+        # shield: a cancelled request must not cancel the shared refresh
+        await asyncio.shield(self._refresh_in_background())
+        if self.loaded_at is None:
+            raise self._last_error or RuntimeError(f"{self.name} feed is unavailable")
+        return self.value
+
+    async def run(self, interval=None):
+        """Background loop: refresh every `interval` seconds (default 80% of ttl)."""
+        interval = interval or self.ttl * 0.8
+        while True:
+            await self._refresh_in_background()
+            await asyncio.sleep(interval)
+
+    def age(self):
+        return None if self.loaded_at is None else time.monotonic() - self.loaded_at
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        age = self.age()
+        return {
+            "age_s": None if age is None else round(age, 1),
+            "version": self.version,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+    def _refresh_in_background(self):
+        # Single flight: concurrent callers share one refresh
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        return self._refreshing
+
+    async def _refresh(self):
+        try:
+            value = await self.load()
+        except Exception as e:
+            # Keep serving the last good value
+            self.refresh_failures += 1
+            self._last_error = e
+            print(f"Refreshing {self.name} failed: {e}")
+            return
+        changed = self.loaded_at is None or value != self.value
+        self.value = value
+        self.loaded_at = time.monotonic()
+        self.refreshes += 1
+        if changed:
+            self.version += 1
+            if self.on_change is not None:
+                asyncio.ensure_future(self.on_change())
+
+
+class TtlLru:
+    """Small per-key cache: entries expire after `ttl` seconds, least recently used go first."""
+
+    def __init__(self, maxsize=10000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
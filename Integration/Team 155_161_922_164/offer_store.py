@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from core import rule_engine, offer_generator
+
+
+def compute_offers(user_data, trends_data, traffic_data):
+    potential_destinations = rule_engine.apply_rules(user_data, trends_data, traffic_data)
+    return offer_generator.generate_offers(potential_destinations)
+
+
+def _compute_chunk(users, trends_data, traffic_data):
+    # Runs in a pool process; one call per chunk keeps pickling overhead low
+    return [(user_id, compute_offers(user_data, trends_data, traffic_data)) for user_id, user_data in users]
+
+
+def fingerprint(user_data):
+    return hashlib.sha1(json.dumps(user_data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class OfferStore:
+    """Materialized offers per user, keyed lookup instead of recomputing per view.
+
+    Each entry remembers the inputs it was computed from: the user's
+    activity fingerprint and the trends/traffic feed versions. A lookup
+    with different inputs is a miss and the caller recomputes that one
+    user. When a feed changes, rebuild_all() recomputes every stored user
+    across a process pool so the next views are hits again.
+    """
+
+    def __init__(self, maxsize=100000, workers=None, chunk_size=500):
+        self.maxsize = maxsize
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._entries = OrderedDict()  # user_id -> (activity_fp, versions, user_data, offers)
+        self._pool = None
+        self._rebuild_lock = asyncio.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.last_rebuild = None
+
+    def lookup(self, user_id, activity_fp, versions):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != activity_fp or entry[1] != versions:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[3]
+
+    def save(self, user_id, user_data, activity_fp, versions, offers):
+        self._entries[user_id] = (activity_fp, versions, user_data, offers)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def rebuild_all(self, inputs):
+        """Recomputes every stored user; `inputs()` returns (trends, traffic, versions)."""
+        async with self._rebuild_lock:
+            trends_data, traffic_data, versions = inputs()
+            if trends_data is None or traffic_data is None:
+                return
+
+            snapshot = [(user_id, entry[0], entry[2]) for user_id, entry in self._entries.items()
+                        if entry[1] != versions]
+            if not snapshot:
+                return
+
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            chunks = [snapshot[i:i + self.chunk_size] for i in range(0, len(snapshot), self.chunk_size)]
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    self._executor(), _compute_chunk,
+                    [(user_id, user_data) for user_id, _, user_data in chunk], trends_data, traffic_data,
+                )
+                for chunk in chunks
+            ])
+
+            fingerprints = {user_id: activity_fp for user_id, activity_fp, _ in snapshot}
+            updated = 0
+            for chunk_result in results:
+                for user_id, offers in chunk_result:
+                    entry = self._entries.get(user_id)
+                    # Skip users whose activity changed while the batch ran
+                    if entry is not None and entry[0] == fingerprints[user_id]:
+                        self._entries[user_id] = (entry[0], versions, entry[2], offers)
+                        updated += 1
+
+            self.last_rebuild = {
+                "users": updated,
+                "seconds": round(time.perf_counter() - started, 3),
+                "finished_at": time.time(),
+            }
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "last_rebuild": self.last_rebuild,
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn, not fork: the event loop and to_thread workers may be mid-request
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
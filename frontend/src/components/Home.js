@@ -66,23 +66,21 @@ const Home = () => {
     }
 
     try {
-      await axios.post("http://localhost:5002/send-email", {
+      // One call to the gateway, which sends email, SMS and push concurrently
+      const res = await axios.post("http://localhost:8080/book-notify", {
         email,
-        destination,
-        ticketType,
-      }, { withCredentials: true });
-
-      await axios.post("http://localhost:5003/send-sms", {
         phone,
         destination,
         ticketType,
       }, { withCredentials: true });
 
-      await axios.post("http://localhost:5004/send-push", {
-        message: `Book your return ticket to ${destination} now!`,
-      });
-
-      alert("✅ Booking Confirmed! Notifications sent.");
+      const failed = Object.keys(res.data.results).filter((channel) => !res.data.results[channel].ok);
+      if (failed.length) {
+        console.error("❌ Some notifications failed:", res.data.results);
+        alert(`✅ Booking Confirmed! Could not send: ${failed.join(", ")}.`);
+      } else {
+        alert("✅ Booking Confirmed! Notifications sent.");
+      }
     } catch (err) {
       console.error("❌ Booking failed:", err);
       alert("Booking failed. Check console.");
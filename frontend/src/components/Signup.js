@@ -10,7 +10,7 @@ function Signup() {
 
   const handleSignup = async () => {
     try {
-      await axios.post('http://localhost:5000/signup', {
+      await axios.post('http://localhost:8080/auth/signup', {
         email,
         phone,
         password,